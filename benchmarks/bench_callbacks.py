@@ -0,0 +1,241 @@
+# bench_callbacks.py
+"""Latency, memory and payload benchmarks for the dashboard callbacks.
+
+Generates synthetic tour data shaped like 2024_rollingstones_tourdata.csv at
+several scales, calls the registered Dash callbacks directly with a set of
+representative inputs and writes p50/p95/p99 latency, peak memory and response
+payload size per callback to a JSON file.
+
+    python benchmarks/bench_callbacks.py --scales 1 10 100 --output bench.json
+    python benchmarks/bench_callbacks.py --compare old.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+import coalesce  # noqa: E402
+import data  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+
+class CallbackRecorder:
+    """Stand-in for the Dash app that keeps the undecorated callback functions."""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        # Coalesced callbacks take the page id as their last State; without one they run every call
+        dependencies = [dep for arg in args for dep in (arg if isinstance(arg, list) else [arg])]
+        takes_page_id = any(dep is coalesce.PAGE_STATE for dep in dependencies)
+
+        def decorator(func):
+            self.callbacks[func.__name__] = (lambda *values: func(*values, None)) if takes_page_id else func
+            return func
+        return decorator
+
+    def clientside_callback(self, *args, **kwargs):
+        pass
+
+
+def make_synthetic_tour_data(scale, base=None, seed=0):
+    """Synthetic TourData with ``scale`` times as many shows as the shipped CSV.
+
+    Shows are resampled from the real data (dates jittered by up to a year),
+    every extra multiple of the data stands in for a different artist with its
+    own tours and venues, setlist lengths follow the real distribution (including
+    the share of shows without a setlist) and songs are drawn from a catalog that
+    grows with the square root of the scale, with Zipf-like frequencies.
+    """
+    base = base or data.load_tour_data()
+    rng = np.random.default_rng(seed)
+    base_df = base.df
+    n_shows = len(base_df) * scale
+
+    rows = rng.integers(0, len(base_df), n_shows)
+    df = base_df.iloc[rows].reset_index(drop=True)
+    artist = np.arange(n_shows) % scale
+    df['date'] = df['date'] + pd.to_timedelta(rng.integers(-365, 366, n_shows), unit='D')
+    df['year'] = df['date'].dt.year
+    for column in ['tour_name', 'venue']:
+        suffix = pd.Series(np.where(artist == 0, '', ' #' + artist.astype(str)))
+        values = df[column].astype(object)
+        df[column] = values.where(values.isna(), values + suffix)
+
+    lengths = np.bincount(base.performances['show_id'].to_numpy(), minlength=base.n_shows)
+    setlist_lengths = rng.choice(lengths, n_shows)
+
+    n_catalog = int(base.n_songs * np.sqrt(scale))
+    weights = 1.0 / np.arange(1, n_catalog + 1) ** 1.1
+    catalog = np.array(list(base.songs) + [f'Song {i}' for i in range(base.n_songs, n_catalog)], dtype=object)
+    rng.shuffle(catalog[base.n_songs:])
+    songs = catalog[rng.choice(n_catalog, setlist_lengths.sum(), p=weights / weights.sum())]
+    setlists = np.split(songs, np.cumsum(setlist_lengths)[:-1])
+    return data.TourData(df, setlists, version=f'synthetic-{scale}x-{seed}')
+
+
+def home_cases(tour_data, rng):
+    df = tour_data.df
+    years = df['year']
+    tours = df['tour_name'].dropna().value_counts().index
+    countries = df['country'].value_counts().index
+    full = [int(years.min()), int(years.max())]
+    return [
+        ('default', [full, None, None, [10, 80000]]),
+        ('decade', [[1990, 1999], None, None, [10, 80000]]),
+        ('one_tour', [full, [tours[0]], None, [10, 80000]]),
+        ('countries', [full, None, list(countries[:5]), [10, 80000]]),
+        ('capacity_band', [full, None, None, [20000, 60000]]),
+        ('combined', [[1970, 2010], [str(tour) for tour in rng.choice(tours[:20], 3, replace=False)],
+                      list(countries[:10]), [5000, 70000]]),
+    ]
+
+
+def song_cases(tour_data, rng):
+    counts = np.bincount(tour_data.performances['song_id'].to_numpy(), minlength=tour_data.n_songs)
+    popular = tour_data.songs[int(np.argmax(counts))]
+    rare = [tour_data.songs[i] for i in rng.choice(np.flatnonzero(counts == 1), 2)] if (counts == 1).any() else []
+    return [(f'song:{song}', [song, song]) for song in [popular, *rare]]
+
+
+def transition_cases(tour_data, rng):
+    years = tour_data.df['year']
+    full = [int(years.min()), int(years.max())]
+    popular = tour_data.songs[int(np.argmax(tour_data.song_offsets[1:] - tour_data.song_offsets[:-1]))]
+    return [
+        ('update_opener_closer_charts', 'all_years', [full]),
+        ('update_opener_closer_charts', 'decade', [[1990, 1999]]),
+        ('update_song_neighbour_charts', f'song:{popular}', [popular, full]),
+        ('update_song_neighbour_charts', f'decade:{popular}', [popular, [1990, 1999]]),
+    ]
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def bench_callback(func, args, repeat, reset):
+    timings = []
+    for _ in range(repeat):
+        reset()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+
+    reset()
+    tracemalloc.start()
+    output = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': percentile_ms(timings, 50),
+        'p95_ms': percentile_ms(timings, 95),
+        'p99_ms': percentile_ms(timings, 99),
+        'peak_memory_bytes': peak,
+        'payload_bytes': len(to_json_plotly(output)),
+    }
+
+
+def run(scales, repeat, seed):
+    import home
+    import song_analysis
+    import transitions
+
+    recorder = CallbackRecorder()
+    home.register_home_callbacks(recorder)
+    song_analysis.register_song_analysis_callbacks(recorder)
+
+    # Measure the computation, not result-cache hits
+    def reset():
+        home.home_cache.clear()
+        transitions.song_transitions(data.tour_data).clear()
+
+    base = data.tour_data
+    results = []
+    for scale in scales:
+        start = time.perf_counter()
+        data.tour_data = make_synthetic_tour_data(scale, base, seed)
+        build_seconds = time.perf_counter() - start
+        rng = np.random.default_rng(seed)
+        print(f'{scale}x: {data.tour_data.n_shows:,} shows, {len(data.tour_data.performances):,} performances '
+              f'({build_seconds:.1f}s to build)', file=sys.stderr)
+
+        cases = [(name, case, args) for case, args in home_cases(data.tour_data, rng)
+                 for name in ['update_key_stats', 'update_songs_chart', 'update_cities_chart', 'update_capacity_scatter']]
+        cases += [('update_song_position_chart', case, args) for case, args in song_cases(data.tour_data, rng)]
+        cases += transition_cases(data.tour_data, rng)
+        for name, case, args in cases:
+            if name not in recorder.callbacks:
+                continue
+            result = bench_callback(recorder.callbacks[name], args, repeat, reset)
+            results.append({'scale': scale, 'callback': name, 'case': case, **result})
+            print(f"  {name:28s} {case:24.24s} p50 {result['p50_ms']:9.2f}ms  p99 {result['p99_ms']:9.2f}ms  "
+                  f"{result['payload_bytes']:>9,}B", file=sys.stderr)
+    data.tour_data = base
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=SRC_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Print p50 latency and payload ratios against an earlier results file
+def compare(previous, results):
+    old = {(r['scale'], r['callback'], r['case']): r for r in previous['results']}
+    for r in results:
+        before = old.get((r['scale'], r['callback'], r['case']))
+        if before is None:
+            continue
+        latency = r['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('nan')
+        payload = r['payload_bytes'] / before['payload_bytes'] if before['payload_bytes'] else float('nan')
+        flag = '  REGRESSION' if latency > 1.2 else ''
+        print(f"{r['scale']:>5}x {r['callback']:28s} {r['case']:24.24s} p50 x{latency:5.2f}  payload x{payload:5.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='dataset sizes as multiples of the shipped CSV (1000 needs several GB of RAM)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per callback and case')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat, args.seed)
+    report = {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'wrote {len(results)} results to {args.output}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
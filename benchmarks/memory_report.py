@@ -0,0 +1,154 @@
+# memory_report.py
+"""Bytes per column of the tour data before and after compaction.
+
+"Before" is the CSV as read by pandas (every column, strings as Python
+objects, raw setlist strings); "after" is the TourData a worker keeps: the
+compacted frame plus the integer-coded setlists and the indexes built on them.
+
+    python benchmarks/memory_report.py
+    python benchmarks/memory_report.py --csv path/to/tourdata.csv
+
+--workers N instead loads the data once and forks N workers from it, like
+gunicorn with preload_app, and prints each worker's private (USS) and
+proportional (PSS) memory right after the fork ("preloaded") and again after
+every worker loaded the CSV on its own ("own load": what each worker did without
+preload_app, and does on a full hot reload). Compare with DATA_SHARED_ARRAYS=0:
+
+    python benchmarks/memory_report.py --workers 4
+    DATA_SHARED_ARRAYS=0 python benchmarks/memory_report.py --workers 4
+
+--ingest measures startup: data.load_tour_data on a cold start (no Parquet
+cache: the CSV is streamed in chunks and the cache written) and then on a warm
+one (the cache is read back), each in a fresh process. It prints how far each
+pushed the peak RSS above the process's RSS before loading, and the snapshot
+size; the cold run also logs the most the chunk builder held at once. The CSV's
+cache is deleted first. Compare chunk sizes (a huge --chunk-rows reads it in one go):
+
+    python benchmarks/memory_report.py --ingest --csv big.csv --chunk-rows 50000
+"""
+import argparse
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+os.environ.setdefault('DATA_RELOAD_SECONDS', '0')
+
+import numpy as np  # noqa: E402
+
+import data  # noqa: E402
+import shared  # noqa: E402
+
+
+def report(path):
+    raw, _ = data.read_tour_csv(path)
+    before = {f'df.{column}': int(size) for column, size in raw.memory_usage(deep=True).items()}
+    after = data.load_tour_data(path).memory_usage()
+
+    rows = [(name, before.get(name), after.get(name)) for name in [*before, *(k for k in after if k not in before)]]
+    width = max(len(name) for name, _, _ in rows)
+    print(f"{'':{width}s} {'before':>12s} {'after':>12s}")
+    for name, old, new in rows:
+        print(f"{name:{width}s} {'-' if old is None else f'{old:,}':>12s} {'-' if new is None else f'{new:,}':>12s}")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{'total':{width}s} {total_before:>12,} {total_after:>12,}  ({total_after / total_before:.0%})")
+
+
+# Read every array of the snapshot, like a worker answering requests does over time
+def touch(tour_data):
+    arrays, _ = tour_data.to_arrays()
+    return sum(int(np.asarray(values).view(np.uint8).sum()) for values in arrays.values())
+
+
+def worker(path, ready, go):
+    touch(data.tour_data)
+    os.write(ready, b'f')
+    os.read(go, 1)
+    data.tour_data = data.load_tour_data(path)
+    touch(data.tour_data)
+    os.write(ready, b'r')
+    os.read(go, 1)
+
+
+def worker_report(path, workers):
+    import psutil
+
+    data.tour_data = data.load_tour_data(path)
+    ready_r, ready_w = os.pipe()
+    go_r, go_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                worker(path, ready_w, go_r)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    for stage in ['preloaded', 'own load']:
+        for _ in pids:
+            os.read(ready_r, 1)
+        usage = [psutil.Process(pid).memory_full_info() for pid in pids]
+        uss, pss = [u.uss for u in usage], [u.pss for u in usage]
+        print(f'{stage:10s}  USS per worker {sum(uss) / len(uss) / 2**20:7.1f} MiB'
+              f'  PSS per worker {sum(pss) / len(pss) / 2**20:7.1f} MiB'
+              f'  PSS total {sum(pss) / 2**20:7.1f} MiB')
+        os.write(go_w, b'x' * len(pids))
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def max_rss():
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+# One load_tour_data in this process, as a worker does it on startup
+def load_report(path, stage):
+    import psutil
+
+    logging.basicConfig(level=logging.INFO, format='    %(message)s')
+    before = psutil.Process().memory_info().rss
+    start = time.perf_counter()
+    tour_data = data.load_tour_data(path)
+    seconds = time.perf_counter() - start
+    print(f'{stage:5s} start  peak RSS +{(max_rss() - before) / 2**20:7.1f} MiB'
+          f'  snapshot {sum(tour_data.memory_usage().values()) / 2**20:7.1f} MiB  {seconds:6.2f} s')
+
+
+def ingest_report(path, chunk_rows):
+    cache_path = data.cache_path_for(path)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    print(f'csv {os.path.getsize(path) / 2**20:.1f} MiB, chunks of {chunk_rows:,d} rows')
+    env = {**os.environ, 'DATA_CHUNK_ROWS': str(chunk_rows)}
+    for stage in ['cold', 'warm']:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--csv', path, '--load', stage], env=env, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=data.DATA_PATH)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--ingest', action='store_true')
+    parser.add_argument('--chunk-rows', type=int, default=data.CHUNK_ROWS)
+    parser.add_argument('--load', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.load:
+        load_report(args.csv, args.load)
+    elif args.ingest:
+        ingest_report(args.csv, args.chunk_rows)
+    elif args.workers:
+        print(f'{args.workers} workers, shared arrays {"on" if shared.SHARED_ARRAYS else "off"}')
+        worker_report(args.csv, args.workers)
+    else:
+        report(args.csv)
+
+
+if __name__ == '__main__':
+    main()
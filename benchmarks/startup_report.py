@@ -0,0 +1,94 @@
+# startup_report.py
+"""Cold-start timings of the dashboard, measured in fresh interpreters.
+
+Each run starts a new Python process that imports app.py and then, through the
+Flask test client, requests what a browser loading the site requests in order:
+the index page, the Dash layout and dependencies, the page-content callback of
+every page and the first Home callbacks. Times are milliseconds since the
+process started executing the probe (interpreter startup is reported
+separately), and the median over the runs is printed.
+
+A real browser spends a while downloading the JS bundles between the index
+page and the layout request; --asset-delay-ms waits that long in the probe.
+
+    python benchmarks/startup_report.py --repeat 5 --asset-delay-ms 800
+    DATA_WARMUP=0 python benchmarks/startup_report.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+PROBE = r'''
+import json, os, sys, time
+start = time.perf_counter()
+marks = {}
+def mark(name):
+    marks[name] = (time.perf_counter() - start) * 1000
+
+import app
+mark('import app')
+client = app.server.test_client()
+client.get('/')
+mark('first response (index)')
+time.sleep(float(os.environ['ASSET_DELAY_MS']) / 1000)
+client.get('/_dash-layout')
+dependencies = client.get('/_dash-dependencies').get_json()
+mark('layout + dependencies')
+
+def call(output, inputs):
+    spec = next(d for d in dependencies if d['output'] == output)
+    body = {
+        'output': output,
+        'outputs': {'id': output.rsplit('.', 1)[0], 'property': output.rsplit('.', 1)[1]},
+        'inputs': [dict(id=i['id'], property=i['property'], value=v) for i, v in zip(spec['inputs'], inputs)],
+        'changedPropIds': [f"{i['id']}.{i['property']}" for i in spec['inputs']],
+        'state': [],
+    }
+    response = client.post('/_dash-update-component', json=body)
+    assert response.status_code in (200, 204), response.status_code
+    return response
+
+call('page-content.children', ['/'])
+mark('home page content')
+call('most-played-songs-chart.figure', [[1962, 2024], None, None, [10, 80000]])
+mark('first home chart')
+call('page-content.children', ['/song-analysis'])
+mark('song analysis page content')
+call('page-content.children', ['/tour-exploration'])
+mark('tour exploration page content')
+print(json.dumps(marks))
+'''
+
+
+def run_once(env):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=SRC_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    total = (time.perf_counter() - start) * 1000
+    marks = json.loads(result.stdout.strip().splitlines()[-1])
+    marks['process total (incl. interpreter)'] = total
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--asset-delay-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    env = {**os.environ, 'PYTHONPATH': SRC_DIR, 'ASSET_DELAY_MS': str(args.asset_delay_ms),
+           'DATA_RELOAD_SECONDS': os.environ.get('DATA_RELOAD_SECONDS', '0')}
+    runs = [run_once(env) for _ in range(args.repeat)]
+    width = max(len(name) for name in runs[0])
+    for name in runs[0]:
+        print(f'{name:{width}s} {statistics.median(run[name] for run in runs):9.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
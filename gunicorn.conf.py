@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+import os
+
+# Load the tour data and build the landing page once in the master, before forking:
+# the workers start warm and share the data (memory-mapped arrays, see src/shared.py)
+# instead of each loading its own copy
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers, so a burst of slider requests from one page is seen (and
+# coalesced, see src/coalesce.py) instead of queueing behind each other and everyone else
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# ... which can then afford a short debounce window
+os.environ.setdefault('CALLBACK_DEBOUNCE_MS', '100')
+os.environ.setdefault('DATA_WARMUP', 'preload')
+
+
+# Threads do not survive the fork, so each worker starts its own CSV reload thread
+def post_fork(server, worker):
+    import data
+    data.manager.start()
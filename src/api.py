@@ -0,0 +1,192 @@
+# api.py
+import hashlib
+import json
+import math
+import os
+
+import flask
+
+from lazy import LazyModule
+
+# Imported on first use (see home.py)
+np = LazyModule('numpy')
+data = LazyModule('data')
+rollup = LazyModule('rollup')
+
+# Seconds clients and proxies may reuse a response without revalidating
+API_MAX_AGE = int(os.environ.get('API_MAX_AGE', 60))
+# Songs or filter sets per request
+API_MAX_BATCH = int(os.environ.get('API_MAX_BATCH', 100))
+# Entries in the song and city rankings of an aggregate
+API_TOP = 10
+
+# Filters left out of a filter set default to the Home page's initial selection
+DEFAULT_CAPACITY_RANGE = [10.0, 80000.0]
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _list(value, name):
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise QueryError(f'{name} must be a list of strings')
+    return sorted(set(value)) or None
+
+
+def _range(value, name, default, cast):
+    if value is None:
+        return default
+    if not isinstance(value, list) or len(value) != 2:
+        raise QueryError(f'{name} must be a [low, high] pair')
+    try:
+        bounds = [cast(value[0]), cast(value[1])]
+    except (TypeError, ValueError, OverflowError):
+        raise QueryError(f'{name} must be a [low, high] pair of numbers') from None
+    # NaN would also end up in the response, which is then not valid JSON
+    if not all(math.isfinite(bound) for bound in bounds):
+        raise QueryError(f'{name} must be a [low, high] pair of finite numbers')
+    return bounds
+
+
+# Canonical form of one filter set, so equal queries get equal ETags
+def parse_filters(filters, tour_data):
+    if not isinstance(filters, dict):
+        raise QueryError('each filter set must be an object')
+    unknown = set(filters) - {'year_range', 'tours', 'countries', 'capacity_range'}
+    if unknown:
+        raise QueryError(f'unknown filters: {", ".join(sorted(unknown))}')
+    years = tour_data.df['year']
+    return {
+        'year_range': _range(filters.get('year_range'), 'year_range', [int(years.min()), int(years.max())], int),
+        'tours': _list(filters.get('tours'), 'tours'),
+        'countries': _list(filters.get('countries'), 'countries'),
+        'capacity_range': _range(filters.get('capacity_range'), 'capacity_range', DEFAULT_CAPACITY_RANGE, float),
+    }
+
+
+def _batch(items, name):
+    if not isinstance(items, list) or not items:
+        raise QueryError(f'{name} must be a non-empty list')
+    if len(items) > API_MAX_BATCH:
+        raise QueryError(f'at most {API_MAX_BATCH} {name} per request')
+    return items
+
+
+# The Home page's numbers for one filter set: key stats, top songs and top cities
+def aggregate(tour_data, filters):
+    args = (filters['year_range'], filters['tours'], filters['countries'], filters['capacity_range'])
+    cube = rollup.rollup_cube(tour_data)
+    selection = cube.select(*args)
+    concerts, countries, unique_songs, attendance, revenue = cube.key_stats(selection)
+    mask = tour_data.show_filter.select(*args)
+    top, plays = tour_data.top_songs(tour_data.song_counts(mask), k=API_TOP, mask=mask)
+    cities, city_concerts = cube.top_cities(selection, k=API_TOP)
+    return {
+        'filters': filters,
+        'concerts': int(concerts),
+        'countries': int(countries),
+        'unique_songs': int(unique_songs),
+        'attendance': float(attendance),
+        'gross_revenue': float(revenue),
+        'top_songs': [{'song': tour_data.songs[song_id], 'plays': int(count)} for song_id, count in zip(top, plays)],
+        'top_cities': [{'city': city, 'concerts': int(count)} for city, count in zip(cities, city_concerts)],
+    }
+
+
+# Normalized setlist position distribution of one song, as on the Song Analysis chart
+def song_positions(tour_data, song):
+    song_id = tour_data.song_index.get(song)
+    if song_id is None:
+        return None
+    counts = np.asarray(tour_data.position_histograms[song_id])
+    total = counts.sum()
+    percentages = np.round(counts / total * 100, 2) if total else np.zeros(len(counts))
+    return {'counts': counts.tolist(), 'percentages': percentages.tolist()}
+
+
+def _query():
+    """The request's query: the JSON body of a POST, or the query string of a GET."""
+    request = flask.request
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise QueryError('expected a JSON object body')
+        return body
+    query = {}
+    for key in request.args:
+        values = request.args.getlist(key)
+        if key == 'filters':
+            try:
+                query[key] = json.loads(values[-1])
+            except ValueError:
+                raise QueryError('filters must be JSON') from None
+        else:
+            query[key] = values
+    return query
+
+
+def _respond(tour_data, endpoint, canonical, compute):
+    """JSON response with a strong ETag over the data version and the canonical query.
+
+    A GET whose If-None-Match already holds the ETag gets a 304 without computing anything
+    (flask-compress tags compressed responses ``"<etag>:<encoding>"``, so the suffix is ignored).
+    """
+    digest = hashlib.sha256(json.dumps([tour_data.version, endpoint, canonical], sort_keys=True).encode())
+    etag = digest.hexdigest()[:32]
+    request = flask.request
+    held = [tag for tag in request.if_none_match.as_set() if tag.split(':', 1)[0] == etag]
+    if request.method in ('GET', 'HEAD') and (held or request.if_none_match.star_tag):
+        response = flask.Response(status=304)
+        response.set_etag(held[0] if held else etag)
+    else:
+        response = flask.jsonify({'version': tour_data.version, **compute()})
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={API_MAX_AGE}'
+    return response
+
+
+def init_app(server, prefix='/api/v1'):
+    """Serve the read-only JSON API on ``server`` under ``prefix``.
+
+    ``GET {prefix}/songs/positions?song=A&song=B`` (or a POST of ``{"songs": [...]}``)
+    returns each song's setlist position distribution; ``GET {prefix}/aggregates?
+    filters=[{...}, ...]`` (or a POST of ``{"filters": [...]}``) returns the Home
+    page numbers for each filter set, which takes ``year_range``, ``tours``,
+    ``countries`` and ``capacity_range`` like the Home filters. Only GET
+    responses are cacheable by proxies; use POST for batches too long for a URL.
+    """
+
+    @server.errorhandler(QueryError)
+    def query_error(error):
+        return flask.jsonify({'error': str(error)}), 400
+
+    @server.route(f'{prefix}/songs/positions', methods=['GET', 'POST'])
+    def api_song_positions():
+        tour_data = data.tour_data
+        query = _query()
+        songs = _batch(query.get('songs', query.get('song')), 'songs')
+        if not all(isinstance(song, str) for song in songs):
+            raise QueryError('songs must be strings')
+        songs = sorted(set(songs))
+
+        def compute():
+            positions = {song: song_positions(tour_data, song) for song in songs}
+            return {
+                'bins': list(range(1, data.POSITION_BINS + 1)),
+                'songs': {song: value for song, value in positions.items() if value is not None},
+                'unknown_songs': [song for song, value in positions.items() if value is None],
+            }
+        return _respond(tour_data, 'songs/positions', songs, compute)
+
+    @server.route(f'{prefix}/aggregates', methods=['GET', 'POST'])
+    def api_aggregates():
+        tour_data = data.tour_data
+        filter_sets = _query().get('filters')
+        if isinstance(filter_sets, dict):
+            filter_sets = [filter_sets]
+        filter_sets = [parse_filters(filters, tour_data) for filters in _batch(filter_sets, 'filters')]
+        return _respond(tour_data, 'aggregates', filter_sets,
+                        lambda: {'results': [aggregate(tour_data, filters) for filters in filter_sets]})
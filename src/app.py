@@ -2,7 +2,20 @@
 import dash
 from dash import html, dcc
 from dash.dependencies import Input, Output
+import os
+import threading
+
 import dash_bootstrap_components as dbc
+import plotly.io as pio
+from flask_compress import Compress
+
+import api
+import coalesce
+import metrics
+from lazy import LazyModule
+
+# Loaded on first use (or by the warm-up below), not before the first response
+data = LazyModule('data')
 
 # Import layouts and callbacks from other files
 from home import home_layout, register_home_callbacks
@@ -15,6 +28,43 @@ app = dash.Dash(__name__, external_stylesheets=[
     'https://fonts.googleapis.com/css2?family=Barlow+Condensed:wght@300;700&display=swap'
 ], suppress_callback_exceptions=True)
 server = app.server
+# Per-callback latency and payload metrics at /metrics
+metrics.init_app(server, app.callback_map)
+# Page load id used to drop superseded callback requests (coalesce.py)
+coalesce.init_app(app)
+# Read-only JSON API over the same computations, at /api/v1
+api.init_app(server)
+
+# Encode callback responses with orjson, which serializes NumPy arrays without .tolist() copies
+pio.json.config.default_engine = os.environ.get('PLOTLY_JSON_ENGINE', 'orjson')
+
+# Compress layout and callback responses (brotli or gzip, as the client accepts)
+server.config.update(
+    COMPRESS_ALGORITHM=os.environ.get('COMPRESS_ALGORITHM', 'br,gzip').split(','),
+    COMPRESS_MIN_SIZE=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+    COMPRESS_BR_LEVEL=int(os.environ.get('COMPRESS_BR_LEVEL', 4)),
+    COMPRESS_LEVEL=int(os.environ.get('COMPRESS_LEVEL', 6)),
+)
+Compress(server)
+
+# Load the data and build the landing page next to serving the first requests rather
+# than before them (the browser is still fetching the JS bundles), then keep picking up
+# shows appended to the CSV without a restart. DATA_WARMUP=0 leaves all of it to the
+# first visit of each page. DATA_WARMUP=preload (set by gunicorn.conf.py) does the
+# loading synchronously instead, in the gunicorn master before it forks the workers,
+# which then share the data; the reload thread is started in each worker after the fork.
+def warm_up(reload=True):
+    if reload:
+        data.manager.start()
+    home_layout(data.tour_data)
+
+
+DATA_WARMUP = os.environ.get('DATA_WARMUP', '1').lower()
+if DATA_WARMUP == 'preload':
+    warm_up(reload=False)
+elif DATA_WARMUP not in ('0', 'false', 'no'):
+    threading.Thread(target=warm_up, name='tour-data-warmup', daemon=True).start()
+
 # Custom CSS for the navbar
 navbar_style = {
     'fontFamily': 'Barlow Condensed, sans-serif',
@@ -65,6 +115,7 @@ navbar = dbc.Navbar(
 # Define the layout
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
+    dcc.Store(id=coalesce.PAGE_ID),
     navbar,
     html.Div(id='page-content')
 ])
@@ -73,12 +124,14 @@ app.layout = html.Div([
 @app.callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
 def display_page(pathname):
+    # Layouts are built on the first visit to each page, for the current data snapshot
+    data.manager.start()  # no-op once the reload thread runs
     if pathname == '/song-analysis':
-        return song_analysis_layout
+        return song_analysis_layout(data.tour_data)
     elif pathname == '/tour-exploration':
-        return tour_exploration_layout
+        return tour_exploration_layout(data.tour_data)
     else:
-        return home_layout
+        return home_layout(data.tour_data)
 
 # Register callbacks from other modules
 register_home_callbacks(app)
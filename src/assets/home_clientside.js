@@ -0,0 +1,212 @@
+// Client-side filtering for the Home page (enabled with HOME_CLIENTSIDE=1).
+// Works on the columnar payload built by clientside.home_payload.
+(function () {
+    var decoded = null;
+
+    var ARRAY_TYPES = {
+        int8: Int8Array, uint8: Uint8Array, int16: Int16Array, uint16: Uint16Array,
+        int32: Int32Array, uint32: Uint32Array, float32: Float32Array, float64: Float64Array
+    };
+
+    function decode(column) {
+        var binary = atob(column.data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new ARRAY_TYPES[column.dtype](bytes.buffer);
+    }
+
+    // Decode the store once per data version
+    function load(payload) {
+        if (decoded && decoded.version === payload.version) {
+            return decoded;
+        }
+        var c = payload.columns;
+        decoded = {
+            version: payload.version,
+            n: payload.n_shows,
+            year: decode(c.year),
+            date: decode(c.date),
+            capacity: decode(c.capacity),
+            price: decode(c.price),
+            tour: decode(c.tour),
+            country: decode(c.country),
+            city: decode(c.city),
+            venue: decode(c.venue),
+            labels: payload.labels,
+            songs: payload.songs,
+            indptr: decode(payload.setlists.indptr),
+            indices: decode(payload.setlists.indices),
+            counts: decode(payload.setlists.counts),
+            first: decode(payload.setlists.first),
+            scatter: payload.scatter
+        };
+        return decoded;
+    }
+
+    function codeSet(labels, selected) {
+        if (!selected || !selected.length) {
+            return null;
+        }
+        var codes = {};
+        selected.forEach(function (value) {
+            var code = labels.indexOf(value);
+            if (code >= 0) {
+                codes[code] = true;
+            }
+        });
+        return codes;
+    }
+
+    // Row indices matching the Home filters (same rules as filters.ShowFilter)
+    function select(d, yearRange, tours, countries, capacityRange) {
+        var tourCodes = codeSet(d.labels.tour, tours);
+        var countryCodes = codeSet(d.labels.country, countries);
+        var rows = [];
+        for (var i = 0; i < d.n; i++) {
+            var capacity = d.capacity[i];
+            if (d.year[i] < yearRange[0] || d.year[i] > yearRange[1]) continue;
+            if (!(capacity >= capacityRange[0] && capacity <= capacityRange[1])) continue;
+            if (tourCodes && !tourCodes[d.tour[i]]) continue;
+            if (countryCodes && !countryCodes[d.country[i]]) continue;
+            rows.push(i);
+        }
+        return rows;
+    }
+
+    // Plays of every song over the rows; firstPlay, if given, gets each song's first play
+    // (its performances-table row) in the rows, which are in show order
+    function songCounts(d, rows, firstPlay) {
+        var counts = new Int32Array(d.songs.length);
+        rows.forEach(function (row) {
+            for (var k = d.indptr[row]; k < d.indptr[row + 1]; k++) {
+                var song = d.indices[k];
+                if (firstPlay && !counts[song]) firstPlay[song] = d.first[k];
+                counts[song] += d.counts[k];
+            }
+        });
+        return counts;
+    }
+
+    // Top k ids by count; ties go to the earlier tieOrder (first play or first seen)
+    function topK(counts, k, tieOrder) {
+        var ids = [];
+        for (var i = 0; i < counts.length; i++) {
+            if (counts[i] > 0) ids.push(i);
+        }
+        ids.sort(function (a, b) {
+            return counts[b] - counts[a] || tieOrder(a) - tieOrder(b);
+        });
+        return ids.slice(0, k);
+    }
+
+    function withBars(figure, labels, counts) {
+        var fig = JSON.parse(JSON.stringify(figure));
+        fig.data[0].y = labels;
+        fig.data[0].x = counts;
+        fig.data[0].marker.color = counts;
+        return fig;
+    }
+
+    function withStat(children, value) {
+        var updated = JSON.parse(JSON.stringify(children));
+        updated[1].props.children = value;
+        return updated;
+    }
+
+    // Rounds half to even like Python's format(value, ',.0f')
+    function formatNumber(value) {
+        var rounded = Math.round(value);
+        if (Math.abs(value % 1) === 0.5 && rounded % 2 !== 0) {
+            rounded -= 1;
+        }
+        return rounded.toLocaleString('en-US');
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        home: {
+            keyStats: function (yearRange, tours, countries, capacityRange, payload) {
+                var d = load(payload);
+                var rows = select(d, yearRange, tours, countries, capacityRange);
+                var seenCountries = {};
+                var nCountries = 0;
+                var attendance = 0;
+                var revenue = 0;
+                rows.forEach(function (row) {
+                    if (d.country[row] >= 0 && !seenCountries[d.country[row]]) {
+                        seenCountries[d.country[row]] = true;
+                        nCountries++;
+                    }
+                    attendance += d.capacity[row];
+                    if (!isNaN(d.price[row])) revenue += d.capacity[row] * d.price[row];
+                });
+                var counts = songCounts(d, rows);
+                var uniqueSongs = 0;
+                for (var i = 0; i < counts.length; i++) {
+                    if (counts[i] > 0) uniqueSongs++;
+                }
+                var tiles = Array.prototype.slice.call(arguments, 5);
+                return [
+                    withStat(tiles[0], formatNumber(rows.length)),
+                    withStat(tiles[1], formatNumber(nCountries)),
+                    withStat(tiles[2], formatNumber(uniqueSongs)),
+                    withStat(tiles[3], formatNumber(attendance)),
+                    withStat(tiles[4], '$' + formatNumber(revenue))
+                ];
+            },
+
+            songsChart: function (yearRange, tours, countries, capacityRange, payload, figure) {
+                var d = load(payload);
+                var firstPlay = new Float64Array(d.songs.length);
+                var counts = songCounts(d, select(d, yearRange, tours, countries, capacityRange), firstPlay);
+                var top = topK(counts, 10, function (id) { return firstPlay[id]; });
+                return withBars(figure, top.map(function (id) { return d.songs[id]; }),
+                                top.map(function (id) { return counts[id]; }));
+            },
+
+            citiesChart: function (yearRange, tours, countries, capacityRange, payload, figure) {
+                var d = load(payload);
+                var counts = new Int32Array(d.labels.city.length);
+                var firstSeen = {};
+                select(d, yearRange, tours, countries, capacityRange).forEach(function (row, i) {
+                    var city = d.city[row];
+                    if (city < 0) return;
+                    if (!(city in firstSeen)) firstSeen[city] = i;
+                    counts[city]++;
+                });
+                var top = topK(counts, 10, function (id) { return firstSeen[id]; });
+                return withBars(figure, top.map(function (id) { return d.labels.city[id]; }),
+                                top.map(function (id) { return counts[id]; }));
+            },
+
+            capacityScatter: function (yearRange, tours, countries, capacityRange, payload, figure) {
+                var d = load(payload);
+                var rows = select(d, yearRange, tours, countries, capacityRange);
+                // Even stride keeps the point cloud's shape when over the point budget
+                if (rows.length > d.scatter.max_points) {
+                    var step = rows.length / d.scatter.max_points;
+                    var sampled = [];
+                    for (var s = 0; s < d.scatter.max_points; s++) {
+                        sampled.push(rows[Math.floor(s * step)]);
+                    }
+                    rows = sampled;
+                }
+                var label = function (column, row) {
+                    var code = d[column][row];
+                    return code >= 0 ? d.labels[column][code] : null;
+                };
+                var fig = JSON.parse(JSON.stringify(figure));
+                var trace = fig.data[0];
+                trace.type = rows.length > d.scatter.webgl_threshold ? 'scattergl' : 'scatter';
+                trace.x = rows.map(function (row) { return d.date[row]; });
+                trace.y = rows.map(function (row) { return d.capacity[row]; });
+                trace.marker.color = trace.y;
+                trace.customdata = rows.map(function (row) {
+                    return [label('venue', row), label('city', row), label('country', row), label('tour', row)];
+                });
+                return fig;
+            }
+        }
+    });
+})();
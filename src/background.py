@@ -0,0 +1,67 @@
+# background.py
+import functools
+import os
+import tempfile
+
+import coalesce
+from lazy import LazyModule
+
+data = LazyModule('data')
+
+# Run the expensive callbacks as jobs in child processes instead of the request
+# thread, with the job queue and results kept on local disk (no broker needed)
+BACKGROUND_CALLBACKS = os.environ.get('BACKGROUND_CALLBACKS', '').lower() in ('1', 'true', 'yes')
+# diskcache directory shared by all workers on the host
+BACKGROUND_CACHE_DIR = os.environ.get('BACKGROUND_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'stonesdashboard-jobs')
+# Seconds a finished result is kept for identical inputs from any session
+BACKGROUND_CACHE_EXPIRE = int(os.environ.get('BACKGROUND_CACHE_EXPIRE', 3600))
+# How often the browser polls a running job
+BACKGROUND_POLL_MS = int(os.environ.get('BACKGROUND_POLL_MS', 250))
+
+manager = None
+if BACKGROUND_CALLBACKS:
+    import diskcache
+    from dash import DiskcacheManager
+
+    # Results are keyed on the callback's source and inputs plus the data version,
+    # so a reload never serves results computed from the old snapshot
+    manager = DiskcacheManager(
+        diskcache.Cache(BACKGROUND_CACHE_DIR),
+        cache_by=[lambda: data.tour_data.version],
+        expire=BACKGROUND_CACHE_EXPIRE,
+    )
+
+
+def ignore_progress(*values):
+    pass
+
+
+def callback(app, *dependencies, progress=None, running=None, cancel=None):
+    """``app.callback`` that runs as a background job when BACKGROUND_CALLBACKS is on.
+
+    A callback with ``progress`` outputs takes ``set_progress`` as its first
+    argument; in the request thread that is a no-op. Dash cancels a job when the
+    same client starts a newer one for the callback, or when a ``cancel`` input fires;
+    in the request thread, ``coalesce.latest_only`` drops the superseded requests
+    (the callback then also gets the page id as its last State).
+    """
+    def decorator(func):
+        if manager is None:
+            if progress is None:
+                return app.callback(*dependencies, coalesce.PAGE_STATE)(coalesce.latest_only(func))
+
+            @functools.wraps(func)
+            def inline(*args):
+                return func(ignore_progress, *args)
+            return app.callback(*dependencies, coalesce.PAGE_STATE)(coalesce.latest_only(inline))
+
+        return app.callback(
+            *dependencies,
+            background=True,
+            manager=manager,
+            interval=BACKGROUND_POLL_MS,
+            progress=progress,
+            running=running,
+            cancel=cancel,
+        )(func)
+    return decorator
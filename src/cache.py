@@ -0,0 +1,130 @@
+# cache.py
+import functools
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Bounded LRU cache of serialized callback results.
+
+    Values are stored as bytes produced by ``dumps`` (pickle by default) and
+    decoded with ``loads`` on every hit. Entries are evicted least-recently-used
+    first once either ``max_entries`` or ``max_bytes`` (measured on the serialized
+    values) is exceeded. When ``shared_dir`` is set, results are also written there
+    so other worker processes can pick them up instead of recomputing; that
+    directory is capped at ``max_entries`` files.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, shared_dir=None,
+                 dumps=pickle.dumps, loads=pickle.loads):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared_dir = shared_dir
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    # Return (True, value) on a hit and (False, None) on a miss
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+        if payload is None and self.shared_dir:
+            payload = self._read_shared(key)
+            if payload is not None:
+                self._store(key, payload)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, self.loads(payload)
+
+    def put(self, key, value):
+        payload = self.dumps(value)
+        self._store(key, payload)
+        if self.shared_dir:
+            self._write_shared(key, payload)
+
+    def _store(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._entries[key] = payload
+            self.nbytes += len(payload)
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def _shared_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.shared_dir, f'{digest}.bin')
+
+    def _read_shared(self, key):
+        path = self._shared_path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)  # keep recently used entries around
+        except OSError:
+            return None
+        return payload
+
+    def _write_shared(self, key, payload):
+        path = self._shared_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            entries = [entry for entry in os.scandir(self.shared_dir) if entry.name.endswith('.bin')]
+            if len(entries) > self.max_entries:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[:len(entries) - self.max_entries]:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+    def memoize(self, key_func):
+        """Decorate a callback so results are cached under ``key_func(*args)``."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                key = (func.__name__, key_func(*args))
+                hit, value = self.get(key)
+                if not hit:
+                    value = func(*args)
+                    self.put(key, value)
+                return value
+            wrapper.cache = self
+            return wrapper
+        return decorator
@@ -0,0 +1,73 @@
+# clientside.py
+import base64
+
+import numpy as np
+import pandas as pd
+
+import downsample
+
+
+# Little-endian typed array as base64, decoded in the browser with the matching TypedArray
+def encode_array(values, dtype=None):
+    values = np.asarray(values)
+    if dtype is None:
+        # Smallest integer type that holds every value
+        dtype = np.result_type(np.min_scalar_type(values.min(initial=0)), np.min_scalar_type(values.max(initial=0)))
+    dtype = np.dtype(dtype).newbyteorder('<')
+    return {
+        'dtype': dtype.name,
+        'data': base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii'),
+    }
+
+
+# Dictionary-encode a string column: int codes (-1 for missing) plus the distinct values
+def encode_labels(values):
+    codes, uniques = pd.factorize(values)
+    return encode_array(codes), [str(value) for value in uniques]
+
+
+def home_payload(tour_data):
+    """Compact columnar summary of the shows for client-side filtering on Home.
+
+    Numeric columns are base64 typed arrays, string columns are dictionary
+    encoded, and setlists are the CSR arrays of the show x song matrix, so the
+    browser can filter and rank without another request. Each matrix entry
+    also carries the performances-table row of the song's first play in that
+    show, which orders ties in the song ranking like TourData.top_songs.
+    """
+    df = tour_data.df
+    matrix = tour_data.show_song_matrix
+    performances = tour_data.performances
+    # Entries in CSR order (show, then song id); the performances are in show and setlist order
+    _, first_play = np.unique(
+        performances['show_id'].to_numpy().astype(np.int64) * tour_data.n_songs + performances['song_id'].to_numpy(),
+        return_index=True)
+    dates = df['date'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+    columns = {
+        'year': encode_array(df['year']),
+        'date': encode_array(dates, 'f8'),
+        'capacity': encode_array(df['venue_capacity'], 'f8'),
+        'price': encode_array(df['avg_price'], 'f8'),
+    }
+    labels = {}
+    for name, column in [('tour', 'tour_name'), ('country', 'country'), ('city', 'city'), ('venue', 'venue')]:
+        columns[name], labels[name] = encode_labels(df[column])
+
+    return {
+        'version': tour_data.version,
+        'n_shows': tour_data.n_shows,
+        'columns': columns,
+        'labels': labels,
+        'songs': list(tour_data.songs),
+        'setlists': {
+            'indptr': encode_array(matrix.indptr),
+            'indices': encode_array(matrix.indices),
+            'counts': encode_array(matrix.data),
+            'first': encode_array(first_play),
+        },
+        'scatter': {
+            'max_points': downsample.MAX_POINTS,
+            'webgl_threshold': downsample.WEBGL_THRESHOLD,
+        },
+    }
@@ -0,0 +1,101 @@
+# coalesce.py
+import collections
+import functools
+import os
+import threading
+import time
+
+import flask
+from dash import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+import metrics
+
+# Wait this long before computing, so a burst of slider moves from one page
+# collapses to its last request (0 = compute at once, only drop superseded requests)
+DEBOUNCE_MS = float(os.environ.get('CALLBACK_DEBOUNCE_MS', 0))
+# Page loads x callbacks tracked per worker; the least recently used are forgotten
+MAX_SLOTS = int(os.environ.get('CALLBACK_COALESCE_SLOTS', 10000))
+
+# Store holding a random id per page load (tabs of one browser each get their own)
+PAGE_ID = 'page-load-id'
+# The last State of every callback wrapped in latest_only
+PAGE_STATE = State(PAGE_ID, 'data')
+
+
+class Slot:
+    def __init__(self):
+        self.generation = 0
+        self.lock = threading.Lock()
+
+
+_slots = collections.OrderedDict()
+_slots_lock = threading.Lock()
+
+
+def _claim(key):
+    with _slots_lock:
+        slot = _slots.get(key)
+        if slot is None:
+            slot = _slots[key] = Slot()
+            if len(_slots) > MAX_SLOTS:
+                _slots.popitem(last=False)
+        else:
+            _slots.move_to_end(key)
+        slot.generation += 1
+        return slot, slot.generation
+
+
+def _superseded():
+    metrics.record_coalesced()
+    raise PreventUpdate
+
+
+def latest_only(func, name=None):
+    """Only answer the newest request of a page load for this callback.
+
+    The callback takes PAGE_STATE as its last State, which is stripped before
+    calling ``func``. A request for which the same page has sent a newer one
+    (the renderer already dropped its response) is answered with "no update"
+    instead of being computed: while it waits out the debounce window, while it
+    waits for the page's previous computation of the callback to finish, or, if
+    it was superseded mid-computation, instead of sending the result. So a burst
+    of slider moves runs at most one computation per page and callback at a
+    time, and the queued ones collapse to the newest inputs. Requests without a
+    page id (sent before the page set it) and calls outside a Flask request
+    (background jobs, which Dash cancels itself) are not coalesced.
+    ``name`` tells apart callbacks registered from the same function.
+    """
+    name = name or f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        *args, page_id = args
+        if not flask.has_request_context() or not isinstance(page_id, str) or not page_id:
+            return func(*args)
+        slot, generation = _claim((page_id, name))
+        if DEBOUNCE_MS > 0:
+            time.sleep(DEBOUNCE_MS / 1000)
+        if slot.generation != generation:
+            _superseded()
+        with slot.lock:
+            if slot.generation != generation:
+                _superseded()
+            result = func(*args)
+        if slot.generation != generation:
+            _superseded()
+        return result
+    return wrapper
+
+
+# Fill the page id store with a random id when the page loads; app.layout holds the store
+def init_app(app):
+    app.clientside_callback(
+        """
+        function(_) {
+            return Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }
+        """,
+        Output(PAGE_ID, 'data'),
+        Input(PAGE_ID, 'id'),
+    )
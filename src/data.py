@@ -0,0 +1,671 @@
+# data.py
+import ast
+import copy
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import shared
+from filters import ShowFilter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # the columnar cache is optional
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '2024_rollingstones_tourdata.csv')
+
+# Schema metadata keys holding the fingerprint of the CSV a cache was built from and the song names
+CACHE_METADATA_KEY = b'stonesdashboard.source'
+CACHE_SONGS_KEY = b'stonesdashboard.songs'
+# Bumped whenever what the cache holds changes, so caches written by older code are rebuilt
+CACHE_FORMAT = 2
+
+# Setlists are normalized to this many slots for position distributions
+POSITION_BINS = 20
+
+# Columns kept in memory; the rest of the CSV (url, venue_alt, start, end, raw setlists) is dropped once parsed
+COLUMNS = ['date', 'year', 'venue', 'city', 'city_alt', 'country', 'tour_name', 'venue_capacity', 'avg_price']
+CATEGORICAL_COLUMNS = ['venue', 'city', 'city_alt', 'country', 'tour_name']
+
+# Seconds between checks of the CSV for new shows (0 disables hot reload)
+RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_SECONDS', 60))
+# Rows per chunk when streaming the CSV (see TourDataBuilder)
+CHUNK_ROWS = int(os.environ.get('DATA_CHUNK_ROWS', 100000))
+
+# A setlist cell made of plain quoted strings, and the strings in it; anything
+# else (escapes, implicit concatenation, ...) goes through ast.literal_eval
+_QUOTED = r"""'[^'\\\n]*'|"[^"\\\n]*\""""
+SETLIST_RE = re.compile(rf'\[\s*(?:(?:{_QUOTED})\s*,\s*)*(?:(?:{_QUOTED})\s*)?\]')
+SETLIST_ITEM_RE = re.compile(r"""'([^'\\\n]*)'|"([^"\\\n]*)\"""")
+
+
+# Parse a raw setlist cell into a list of song names (missing setlists become empty lists)
+def parse_setlist(setlist):
+    if not isinstance(setlist, str):
+        return []
+    if SETLIST_RE.fullmatch(setlist):
+        return [single or double for single, double in SETLIST_ITEM_RE.findall(setlist)]
+    return ast.literal_eval(setlist)
+
+
+# Normalize position to a 20-song setlist (works element-wise on arrays)
+def normalize_position(position, setlist_length):
+    return np.round((position / setlist_length) * POSITION_BINS).astype(int)
+
+
+def compact_frame(df):
+    """The used columns only, with strings as categoricals and ``year`` downcast.
+
+    Categories are kept in order of first appearance, so value_counts ties and
+    factorize codes come out as they did for the plain string columns.
+    Capacity and price stay float64: the attendance and revenue totals are
+    summed over them and float32 would change the figures shown.
+    """
+    df = df[COLUMNS].copy()
+    for column in CATEGORICAL_COLUMNS:
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            df[column] = pd.Categorical(values, categories=values.dropna().unique())
+    df['year'] = df['year'].astype(np.int16)
+    return df
+
+
+def nbytes(obj):
+    """Approximate memory held by a frame, array, sparse matrix or dict/list of them."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True, index=True).sum()) if isinstance(obj, pd.DataFrame) \
+            else int(obj.memory_usage(deep=True))
+    if sparse.issparse(obj):
+        return obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(value) for value in obj)
+    return 0
+
+
+# Performances table of the given setlists, numbering new songs after the known ones
+# (``songs`` and ``song_index`` are extended in place)
+def encode_setlists(setlists, first_show, songs, song_index):
+    show_ids, song_ids, positions, lengths = [], [], [], []
+    for show_id, setlist in enumerate(setlists, start=first_show):
+        for position, song in enumerate(setlist, start=1):
+            song_id = song_index.get(song)
+            if song_id is None:
+                song_id = song_index[song] = len(songs)
+                songs.append(song)
+            show_ids.append(show_id)
+            song_ids.append(song_id)
+            positions.append(position)
+            lengths.append(len(setlist))
+
+    return pd.DataFrame({
+        'show_id': np.array(show_ids, dtype=np.int32),
+        'song_id': np.array(song_ids, dtype=np.int32),
+        'position': np.array(positions, dtype=np.int16),
+        'setlist_length': np.array(lengths, dtype=np.int16),
+    })
+
+
+class TourData:
+    """Tour shows plus the setlists parsed once into an exploded, integer-coded table.
+
+    ``performances`` has one row per song played, with ``show_id`` (row position in
+    ``df``), ``song_id`` (index into ``songs``), 1-based ``position`` and the
+    ``setlist_length`` of that show. Song ids are assigned in order of first appearance.
+
+    Two song-level structures are built on top of it: an inverted index from each
+    song to its performances (``song_offsets`` into ``song_order``, CSR style) and
+    ``position_histograms``, a songs x 20 matrix of normalized setlist positions.
+    Both count every occurrence, including songs played more than once in a show.
+    ``show_song_matrix`` is the sparse (CSR) shows x songs count matrix, so song
+    counts for any set of shows are a single mask-times-matrix product.
+    ``show_filter`` is the bitmap index used to answer the Home filters.
+
+    A snapshot is never modified once built; ``append`` returns a new one.
+    Structures built per snapshot elsewhere (transitions, routes) extend those of
+    ``appended_to()`` when it is still around rather than starting over.
+    """
+
+    def __init__(self, df, setlists=None, version=None):
+        if setlists is None:
+            setlists = [parse_setlist(setlist) for setlist in df['setlist']]
+        self.df = compact_frame(df.reset_index(drop=True))
+        self.version = version
+        self._appended_to = None
+
+        self.songs = []
+        self.song_index = {}
+        self.performances = self._encode_setlists(setlists, first_show=0)
+        self.all_songs = sorted(self.songs)
+        self._build_song_index()
+        self.show_filter = ShowFilter(self.df)
+
+    @classmethod
+    def from_encoded(cls, df, songs, performances, version=None):
+        """Snapshot from a compact frame and already encoded performances (see TourDataBuilder)."""
+        tour_data = cls.__new__(cls)
+        tour_data.df = df
+        tour_data.version = version
+        tour_data._appended_to = None
+        tour_data.songs = songs
+        tour_data.song_index = {song: song_id for song_id, song in enumerate(songs)}
+        tour_data.performances = performances
+        tour_data.all_songs = sorted(songs)
+        tour_data._build_song_index()
+        tour_data.show_filter = ShowFilter(df)
+        return tour_data
+
+    def _encode_setlists(self, setlists, first_show):
+        return encode_setlists(setlists, first_show, self.songs, self.song_index)
+
+    def _build_song_index(self):
+        song_ids = self.performances['song_id'].to_numpy()
+        self.song_order = np.argsort(song_ids, kind='stable').astype(np.int32)
+        self.song_offsets = np.zeros(self.n_songs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(song_ids, minlength=self.n_songs), out=self.song_offsets[1:])
+
+        # Slot 0 (songs rounded to the very start of a long setlist) is not charted
+        slots = normalize_position(self.performances['position'].to_numpy(),
+                                   self.performances['setlist_length'].to_numpy())
+        histograms = np.bincount(song_ids.astype(np.int64) * (POSITION_BINS + 1) + slots,
+                                 minlength=self.n_songs * (POSITION_BINS + 1))
+        self.position_histograms = histograms.reshape(self.n_songs, POSITION_BINS + 1)[:, 1:]
+
+        show_ids = self.performances['show_id'].to_numpy()
+        self.show_song_matrix = sparse.csr_matrix(
+            (np.ones(len(show_ids), dtype=np.int32), (show_ids, song_ids)),
+            shape=(self.n_shows, self.n_songs),
+        )
+
+    def append(self, df, setlists, version=None):
+        """New snapshot with the shows in ``df`` (and their parsed setlists) added at the end.
+
+        Existing show and song ids are kept, so only the new performances are
+        encoded and the song index, position histograms and show x song matrix
+        are extended rather than rebuilt.
+        """
+        new = copy.copy(self)
+        # Categoricals with different categories concatenate to strings, so re-encode
+        new.df = compact_frame(pd.concat([self.df, compact_frame(df)], ignore_index=True))
+        new.version = version
+        new._appended_to = weakref.ref(self)
+        new.songs = list(self.songs)
+        new.song_index = dict(self.song_index)
+        added = new._encode_setlists(setlists, first_show=self.n_shows)
+        new.performances = pd.concat([self.performances, added], ignore_index=True)
+        new.all_songs = sorted(self.all_songs + new.songs[self.n_songs:])
+        new._extend_song_index(self, added)
+        new.show_filter = ShowFilter(new.df)
+        return new
+
+    # The snapshot this one was appended to, or None after a full load or once it was dropped
+    def appended_to(self):
+        return None if self._appended_to is None else self._appended_to()
+
+    def _extend_song_index(self, old, added):
+        song_ids = added['song_id'].to_numpy()
+        n_old = len(old.performances)
+
+        # Both runs are already sorted by song, so the stable sort is a linear merge
+        added_order = np.argsort(song_ids, kind='stable')
+        old_ids = old.performances['song_id'].to_numpy()
+        merged = np.argsort(np.concatenate([old_ids[old.song_order], song_ids[added_order]]), kind='stable')
+        self.song_order = np.concatenate([old.song_order, (added_order + n_old).astype(np.int32)])[merged]
+        counts = np.bincount(song_ids, minlength=self.n_songs)
+        counts[:old.n_songs] += np.diff(old.song_offsets)
+        self.song_offsets = np.zeros(self.n_songs + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.song_offsets[1:])
+
+        slots = normalize_position(added['position'].to_numpy(), added['setlist_length'].to_numpy())
+        histograms = np.bincount(song_ids.astype(np.int64) * (POSITION_BINS + 1) + slots,
+                                 minlength=self.n_songs * (POSITION_BINS + 1))
+        histograms = histograms.reshape(self.n_songs, POSITION_BINS + 1)[:, 1:]
+        histograms[:old.n_songs] += old.position_histograms
+        self.position_histograms = histograms
+
+        matrix = old.show_song_matrix.copy()
+        matrix.resize(old.n_shows, self.n_songs)
+        added_matrix = sparse.csr_matrix(
+            (np.ones(len(song_ids), dtype=np.int32), (added['show_id'].to_numpy() - old.n_shows, song_ids)),
+            shape=(self.n_shows - old.n_shows, self.n_songs),
+        )
+        self.show_song_matrix = sparse.vstack([matrix, added_matrix], format='csr')
+
+    def to_arrays(self):
+        """Every array of the snapshot by name, plus a JSON-able manifest to rebuild it (see shared.py)."""
+        arrays = {}
+        columns = {}
+        for column, values in self.df.items():
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                arrays[f'df.{column}'] = values.cat.codes.to_numpy()
+                columns[column] = list(values.cat.categories)
+            else:
+                arrays[f'df.{column}'] = values.to_numpy()
+                columns[column] = None
+        for column, values in self.performances.items():
+            arrays[f'performances.{column}'] = values.to_numpy()
+        arrays['song_order'] = self.song_order
+        arrays['song_offsets'] = self.song_offsets
+        arrays['position_histograms'] = self.position_histograms
+        for part in ['data', 'indices', 'indptr']:
+            arrays[f'show_song_matrix.{part}'] = getattr(self.show_song_matrix, part)
+        filter_arrays, filter_labels = self.show_filter.to_arrays()
+        arrays.update({f'show_filter.{name}': values for name, values in filter_arrays.items()})
+        return arrays, {'columns': columns, 'show_filter': filter_labels}
+
+    def adopt_arrays(self, arrays, manifest):
+        """Replace this snapshot's arrays with equal ones, e.g. read-only memory maps, without copying them."""
+        columns = {}
+        for column, categories in manifest['columns'].items():
+            values = arrays[f'df.{column}']
+            columns[column] = values if categories is None else \
+                pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories), validate=False)
+        self.df = pd.DataFrame(columns, copy=False)
+        self.performances = pd.DataFrame(
+            {column: arrays[f'performances.{column}'] for column in self.performances}, copy=False)
+        self.song_order = arrays['song_order']
+        self.song_offsets = arrays['song_offsets']
+        self.position_histograms = arrays['position_histograms']
+        self.show_song_matrix = sparse.csr_matrix(
+            tuple(arrays[f'show_song_matrix.{part}'] for part in ['data', 'indices', 'indptr']),
+            shape=self.show_song_matrix.shape, copy=False)
+        prefix = 'show_filter.'
+        self.show_filter.adopt_arrays(
+            {name[len(prefix):]: values for name, values in arrays.items() if name.startswith(prefix)},
+            manifest['show_filter'])
+
+    def memory_usage(self):
+        """Bytes held by each column of ``df`` and by each derived structure."""
+        usage = {f'df.{column}': int(size) for column, size in self.df.memory_usage(deep=True).items()}
+        usage.update({
+            'performances': nbytes(self.performances),
+            'song_index': nbytes([self.song_order, self.song_offsets]),
+            'position_histograms': nbytes(self.position_histograms),
+            'show_song_matrix': nbytes(self.show_song_matrix),
+            'show_filter': nbytes(vars(self.show_filter)),
+        })
+        return usage
+
+    @property
+    def n_shows(self):
+        return len(self.df)
+
+    @property
+    def n_songs(self):
+        return len(self.songs)
+
+    # All performances of a song as rows of the performances table
+    def song_occurrences(self, song_id):
+        rows = self.song_order[self.song_offsets[song_id]:self.song_offsets[song_id + 1]]
+        return self.performances.iloc[rows]
+
+    # Number of performances of every song over the shows selected by a boolean row mask
+    def song_counts(self, mask):
+        return self.show_song_matrix.T @ mask.astype(np.int32)
+
+    # Performances-table row of each song's first play in the shows selected by a boolean row mask
+    def first_performances(self, song_ids, mask):
+        starts = self.song_offsets[song_ids]
+        lengths = self.song_offsets[song_ids + 1] - starts
+        # The performances of every song, concatenated (each song's rows are in show order)
+        rows = self.song_order[np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())]
+        song = np.repeat(np.arange(len(song_ids)), lengths)
+        played = mask[self.performances['show_id'].to_numpy()[rows]]
+        first = np.full(len(song_ids), len(self.performances), dtype=np.int64)
+        np.minimum.at(first, song[played], rows[played])
+        return first
+
+    # The k most played song ids and their counts. Ties go to the song played first in the
+    # shows selected by ``mask`` (the order value_counts gave), or without one to the earlier song id
+    def top_songs(self, counts, k=10, mask=None):
+        k = min(k, np.count_nonzero(counts))
+        if not k:
+            return np.array([], dtype=np.int64), counts[:0]
+        candidates = np.flatnonzero(counts >= np.partition(counts, len(counts) - k)[len(counts) - k])
+        tied = len(np.unique(counts[candidates])) < len(candidates)
+        first = self.first_performances(candidates, mask) if mask is not None and tied else candidates
+        top = candidates[np.lexsort((first, -counts[candidates]))][:k]
+        return top, counts[top]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Feed the next ``size`` bytes of ``f`` to ``digest`` in blocks; returns how many there were
+def _hash_prefix(digest, f, size):
+    remaining = size
+    while remaining > 0:
+        block = f.read(min(1 << 20, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return size - remaining
+
+
+def cache_path_for(path):
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def read_tour_csv(path):
+    df = pd.read_csv(path)  # also takes a file-like object
+    df['date'] = pd.to_datetime(df['date'])
+    df['year'] = df['date'].dt.year
+    setlists = [parse_setlist(setlist) for setlist in df['setlist']]
+    return df, setlists
+
+
+# Columns read when streaming: the kept ones (``year`` comes from ``date``) and the raw setlists
+STREAM_COLUMNS = [column for column in COLUMNS if column != 'year'] + ['setlist']
+STREAM_DTYPES = {**{column: str for column in CATEGORICAL_COLUMNS}, 'venue_capacity': float, 'avg_price': float}
+
+
+def read_tour_chunks(source, chunk_rows=CHUNK_ROWS):
+    """Yield the CSV as (frame, parsed setlists) chunks of up to ``chunk_rows`` shows."""
+    with pd.read_csv(source, usecols=STREAM_COLUMNS, dtype=STREAM_DTYPES, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            chunk['date'] = pd.to_datetime(chunk['date'])
+            chunk['year'] = chunk['date'].dt.year
+            yield chunk, [parse_setlist(setlist) for setlist in chunk.pop('setlist')]
+
+
+class _HashingReader:
+    """Binary file wrapper hashing the bytes as the CSV parser reads them."""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        block = self.f.read(size)
+        self.digest.update(block)
+        return block
+
+    def hexdigest(self):
+        self.digest.update(self.f.read())
+        return self.digest.hexdigest()
+
+
+class TourDataBuilder:
+    """Builds a TourData from CSV chunks, holding the raw text of only one chunk at a time.
+
+    Each chunk is reduced to what the snapshot keeps before the next one is
+    read: string columns become codes of categories that grow in order of first
+    appearance (the order compact_frame gives), and setlists are encoded into
+    the integer performance columns straight away. The song, position and
+    year/tour/country indexes are then built from those compact columns.
+    ``peak_bytes`` is the most the builder held at once: the compact columns
+    so far plus the chunk being reduced.
+    """
+
+    def __init__(self):
+        self.n_shows = 0
+        self.n_chunks = 0
+        self.categories = {column: {} for column in CATEGORICAL_COLUMNS}
+        self.columns = {column: [] for column in COLUMNS}
+        self.songs = []
+        self.song_index = {}
+        self.performances = []
+        self.peak_bytes = 0
+
+    def held_bytes(self):
+        return nbytes(self.columns) + nbytes(self.performances)
+
+    def add(self, df, setlists):
+        chunk_bytes = nbytes(df)
+        for column in COLUMNS:
+            values = df[column]
+            if column in CATEGORICAL_COLUMNS:
+                codes, uniques = pd.factorize(values)
+                index = self.categories[column]
+                # Chunk codes to global ones; the trailing -1 keeps missing values missing
+                mapping = np.array([index.setdefault(value, len(index)) for value in uniques] + [-1], dtype=np.int32)
+                values = mapping[codes]
+            else:
+                values = values.to_numpy(dtype=np.int16 if column == 'year' else None)
+            self.columns[column].append(values)
+        self.performances.append(encode_setlists(setlists, self.n_shows, self.songs, self.song_index))
+        self.n_shows += len(df)
+        self.n_chunks += 1
+        self.peak_bytes = max(self.peak_bytes, chunk_bytes + self.held_bytes())
+
+    def finish(self, version=None):
+        columns = {}
+        for column in COLUMNS:
+            values = np.concatenate(self.columns.pop(column))
+            if column in CATEGORICAL_COLUMNS:
+                values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(list(self.categories[column])))
+            columns[column] = values
+        performances = pd.DataFrame({
+            column: np.concatenate([chunk[column].to_numpy() for chunk in self.performances])
+            for column in ['show_id', 'song_id', 'position', 'setlist_length']
+        })
+        self.performances = []
+        return TourData.from_encoded(pd.DataFrame(columns), self.songs, performances, version)
+
+
+def stream_tour_data(path, chunk_rows=CHUNK_ROWS):
+    """TourData of the CSV at ``path`` read in chunks; its version is the CSV hash, taken in the same pass."""
+    builder = TourDataBuilder()
+    with open(path, 'rb') as f:
+        reader = _HashingReader(f)
+        for df, setlists in read_tour_chunks(reader, chunk_rows):
+            builder.add(df, setlists)
+        version = reader.hexdigest()
+    tour_data = builder.finish(version)
+    logger.info('read %s: %d shows in %d chunks, peak %.1f MiB held while reading',
+                path, builder.n_shows, builder.n_chunks, builder.peak_bytes / 2**20)
+    return tour_data
+
+
+# Return the cached snapshot if the cache was built from this exact CSV by this code
+def _read_cache(cache_path, path, stat):
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+    except (OSError, pa.ArrowException):
+        return None
+    source = json.loads(metadata.get(CACHE_METADATA_KEY, b'{}'))
+    if source.get('format') != CACHE_FORMAT:
+        return None
+    if (source.get('size'), source.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+        # Touched but possibly unchanged (e.g. a fresh checkout): fall back to the content hash
+        if source.get('sha256') != file_sha256(path):
+            return None
+    table = pq.read_table(cache_path)
+    setlists = table.column('setlist_song_ids').combine_chunks()
+    df = compact_frame(table.drop(['setlist_song_ids']).to_pandas())
+    del table
+
+    # The performances table back from the per-show lists of song ids
+    song_ids = setlists.flatten().to_numpy()
+    offsets = setlists.offsets.to_numpy().astype(np.int32)
+    offsets -= offsets[0]
+    lengths = np.diff(offsets)
+    show_ids = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+    positions = np.arange(1, len(song_ids) + 1, dtype=np.int32)
+    positions -= offsets[show_ids]
+    performances = pd.DataFrame({
+        'show_id': show_ids,
+        'song_id': song_ids.astype(np.int32, copy=False),
+        'position': positions.astype(np.int16),
+        'setlist_length': lengths.astype(np.int16)[show_ids],
+    })
+    songs = json.loads(metadata[CACHE_SONGS_KEY])
+    return TourData.from_encoded(df, songs, performances, version=source['sha256'])
+
+
+def _write_cache(cache_path, tour_data, source):
+    """Store the compact frame with each show's setlist as a list of song ids.
+
+    That is the performances table grouped by show (positions and setlist
+    lengths follow from the lists), so neither writing nor reading the cache
+    builds Python lists of song names; the names are kept in the metadata.
+    """
+    counts = np.bincount(tour_data.performances['show_id'].to_numpy(), minlength=tour_data.n_shows)
+    offsets = np.zeros(tour_data.n_shows + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    setlists = pa.ListArray.from_arrays(offsets, tour_data.performances['song_id'].to_numpy())
+    table = pa.Table.from_pandas(tour_data.df, preserve_index=False).append_column('setlist_song_ids', setlists)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        CACHE_METADATA_KEY: json.dumps({**source, 'format': CACHE_FORMAT}).encode(),
+        CACHE_SONGS_KEY: json.dumps(tour_data.songs).encode(),
+    })
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # A read-only deploy just means every start parses the CSV
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_tour_data(path=DATA_PATH, use_cache=True):
+    """Load the tour CSV, going through a Parquet cache stored next to it.
+
+    The cache holds the compacted frame and the encoded setlists and is rebuilt
+    whenever the CSV's size/mtime and content hash no longer match the ones it
+    was built from, or its CACHE_FORMAT is not the current one; without it the
+    CSV is streamed in chunks (stream_tour_data).
+    The CSV hash doubles as the snapshot ``version``.
+    The snapshot's arrays are then memory-mapped from a per-version store (see
+    shared.py), so worker processes share them.
+    """
+    stat = os.stat(path)
+    use_cache = use_cache and pq is not None
+    cache_path = cache_path_for(path)
+
+    tour_data = _read_cache(cache_path, path, stat) if use_cache and os.path.exists(cache_path) else None
+    if tour_data is None:
+        tour_data = stream_tour_data(path)
+        if use_cache:
+            _write_cache(cache_path, tour_data,
+                         {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': tour_data.version})
+    return shared.share(tour_data, path)
+
+
+class TourDataManager:
+    """Keeps ``data.tour_data`` in sync with the CSV without restarting workers.
+
+    When the CSV changed and its previous content is still a byte-for-byte
+    prefix (shows were appended), only the new rows are parsed and the current
+    snapshot is extended with ``TourData.append``; any other change, or new
+    rows that do not parse, reloads the file. Only whole lines are taken, so a
+    row the writer has not finished yet waits for a later refresh: ``size`` is
+    how much of the file the current snapshot covers. The finished snapshot
+    replaces ``data.tour_data`` in one assignment, so a callback that reads
+    ``data.tour_data`` once sees either the old or the new data, never a mix.
+    """
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.stat = os.stat(path)
+        self.size = self.stat.st_size
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _changed(self, stat):
+        return (stat.st_size, stat.st_mtime_ns) != (self.stat.st_size, self.stat.st_mtime_ns)
+
+    # The appended whole lines as (CSV text with the header, new CSV hash, new size),
+    # or None when the old content was rewritten
+    def _read_appended(self, current, stat):
+        if stat.st_size < self.size:
+            return None
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            f.seek(0)
+            if _hash_prefix(digest, f, self.size) != self.size or digest.hexdigest() != current.version:
+                return None
+            tail = f.read(stat.st_size - self.size)
+        tail = tail[:tail.rfind(b'\n') + 1]
+        digest.update(tail)
+        return header + tail, digest.hexdigest(), self.size + len(tail)
+
+    # The current snapshot extended with the appended rows, or None if they do not parse
+    def _append(self, current, text, sha256):
+        try:
+            df, setlists = read_tour_csv(io.BytesIO(text))
+        except (ValueError, SyntaxError):  # pandas' ParserError and DateParseError, malformed setlists
+            logger.warning('could not parse the rows appended to %s, reloading it', self.path, exc_info=True)
+            return None
+        new = shared.share(current.append(df, setlists, version=sha256), self.path)
+        logger.info('appended %d shows from %s', len(df), self.path)
+        return new
+
+    def refresh(self):
+        """Publish a new snapshot if the CSV changed; returns whether it did."""
+        global tour_data
+        with self._lock:
+            stat = os.stat(self.path)
+            if not self._changed(stat):
+                return False
+            current = tour_data
+            appended = self._read_appended(current, stat)
+            new = None
+            if appended is not None:
+                text, sha256, size = appended
+                if size == self.size:
+                    # Only part of a row so far
+                    self.stat = stat
+                    return False
+                new = self._append(current, text, sha256)
+                if new is not None and pq is not None:
+                    _write_cache(cache_path_for(self.path), new,
+                                 {'size': size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256})
+            if new is None:
+                # A CSV that does not load is retried when it changes again, not on every poll
+                self.stat = stat
+                new = load_tour_data(self.path)
+                size = stat.st_size
+                logger.info('reloaded %s: %d shows', self.path, new.n_shows)
+            self.stat = stat
+            self.size = size
+            tour_data = new
+            return True
+
+    # Poll the CSV from a daemon thread (one per worker process)
+    def start(self, interval=RELOAD_INTERVAL):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if interval <= 0 or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._poll, args=(interval,), name='tour-data-reload', daemon=True)
+        self._thread.start()
+
+    def _poll(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('reloading %s failed', self.path)
+
+
+tour_data = load_tour_data()
+manager = TourDataManager()
@@ -0,0 +1,64 @@
+# downsample.py
+import os
+
+import numpy as np
+import pandas as pd
+
+# Above this many points the scatter is drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = int(os.environ.get('SCATTER_WEBGL_THRESHOLD', 1000))
+# Upper bound on the points sent to the browser for the visible x-range
+MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', 5000))
+# Grid used to keep the shape of the point cloud when sampling
+GRID_SIZE = (200, 50)
+
+
+# Visible x-range from a graph's relayoutData, or None when autoranged
+def parse_x_range(relayout_data):
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return None
+
+
+def sample_rows(x, y, max_points=MAX_POINTS, x_range=None):
+    """Positions of the rows to draw for the visible part of a scatter.
+
+    Rows outside ``x_range`` are dropped. If more than ``max_points`` remain, the
+    visible area is split into a grid and every occupied cell keeps a share of
+    its points proportional to its count (at least one), so dense regions stay
+    dense and outliers stay visible. The result is deterministic for the same input.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    rows = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+    if x_range is not None:
+        rows = rows[(x[rows] >= x_range[0]) & (x[rows] <= x_range[1])]
+    if len(rows) <= max_points:
+        return rows
+
+    cells = np.zeros(len(rows), dtype=np.int64)
+    for values, size in ((x[rows], GRID_SIZE[0]), (y[rows], GRID_SIZE[1])):
+        low, high = values.min(), values.max()
+        scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+        cells = cells * size + np.minimum((scaled * size).astype(np.int64), size - 1)
+
+    # Shuffle with a fixed seed so the kept points are not biased towards early rows
+    shuffled = np.random.default_rng(0).permutation(len(rows))
+    order = shuffled[np.argsort(cells[shuffled], kind='stable')]
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    quotas = np.maximum(1, counts * max_points // len(rows))
+    rank = np.arange(len(order)) - np.repeat(starts, counts)
+    keep = order[rank < np.repeat(quotas, counts)]
+    return rows[np.sort(keep)]
+
+
+# Convert relayoutData range bounds (date strings) to the float ns used by sample_rows
+def x_range_to_ns(x_range):
+    if x_range is None:
+        return None
+    return tuple(float(pd.Timestamp(bound).value) for bound in x_range)
@@ -0,0 +1,106 @@
+# filters.py
+import numpy as np
+import pandas as pd
+
+
+# One packed bitset (np.packbits over show rows) per distinct non-null value
+def value_bitsets(values):
+    codes, uniques = pd.factorize(values)
+    n = len(codes)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    bitsets = {}
+    for code, value in enumerate(uniques):
+        rows = np.zeros(n, dtype=bool)
+        rows[order[bounds[code]:bounds[code + 1]]] = True
+        bitsets[value] = np.packbits(rows)
+    return bitsets
+
+
+class ShowFilter:
+    """Bitmap index answering the Home filters (years, tours, countries, capacity).
+
+    Tours and countries get one packed bitset per value. Years are stored as
+    cumulative bitsets (shows up to and including each year), so a year range is
+    a single AND NOT. Venue capacity keeps the rows sorted by capacity and answers
+    a range with two binary searches. Selections match the pandas comparisons
+    they replace: missing values never match.
+    """
+
+    def __init__(self, df):
+        self.n_shows = len(df)
+        self.tour_bitsets = value_bitsets(df['tour_name'])
+        self.country_bitsets = value_bitsets(df['country'])
+
+        years = df['year'].to_numpy()
+        self.years = np.unique(years)
+        year_bitsets = value_bitsets(years)
+        self.year_prefix = np.bitwise_or.accumulate(
+            np.stack([year_bitsets[year] for year in self.years]), axis=0)
+
+        capacity = df['venue_capacity'].to_numpy(dtype=float)
+        rows = np.flatnonzero(~np.isnan(capacity))
+        order = np.argsort(capacity[rows], kind='stable')
+        self.capacity_rows = rows[order]
+        self.sorted_capacity = capacity[self.capacity_rows]
+
+    # Arrays to keep in shared memory, plus the values labelling the bitset rows
+    def to_arrays(self):
+        arrays = {
+            'years': self.years,
+            'year_prefix': self.year_prefix,
+            'capacity_rows': self.capacity_rows,
+            'sorted_capacity': self.sorted_capacity,
+        }
+        labels = {}
+        for name in ['tour_bitsets', 'country_bitsets']:
+            bitsets = getattr(self, name)
+            labels[name] = list(bitsets)
+            arrays[name] = np.stack(list(bitsets.values())) if bitsets else np.zeros((0, len(self._empty())), np.uint8)
+        return arrays, labels
+
+    # Swap in equal (e.g. memory-mapped) arrays from to_arrays
+    def adopt_arrays(self, arrays, labels):
+        for name in ['years', 'year_prefix', 'capacity_rows', 'sorted_capacity']:
+            setattr(self, name, arrays[name])
+        for name, values in labels.items():
+            setattr(self, name, dict(zip(values, arrays[name])))
+
+    def _empty(self):
+        return np.zeros((self.n_shows + 7) // 8, dtype=np.uint8)
+
+    def _year_bits(self, start, end):
+        hi = np.searchsorted(self.years, end, side='right') - 1
+        lo = np.searchsorted(self.years, start, side='left') - 1
+        if hi < 0 or hi <= lo:
+            return self._empty()
+        if lo < 0:
+            return self.year_prefix[hi]
+        return self.year_prefix[hi] & ~self.year_prefix[lo]
+
+    def _capacity_bits(self, low, high):
+        start = np.searchsorted(self.sorted_capacity, low, side='left')
+        stop = np.searchsorted(self.sorted_capacity, high, side='right')
+        rows = np.zeros(self.n_shows, dtype=bool)
+        rows[self.capacity_rows[start:stop]] = True
+        return np.packbits(rows)
+
+    def _any_of(self, bitsets, values):
+        bits = self._empty()
+        for value in values:
+            if value in bitsets:
+                bits |= bitsets[value]
+        return bits
+
+    def select_bits(self, year_range, selected_tours, selected_countries, capacity_range):
+        bits = self._year_bits(*year_range) & self._capacity_bits(*capacity_range)
+        if selected_tours:
+            bits &= self._any_of(self.tour_bitsets, selected_tours)
+        if selected_countries:
+            bits &= self._any_of(self.country_bitsets, selected_countries)
+        return bits
+
+    # Boolean row mask over the shows matching the Home filters
+    def select(self, year_range, selected_tours, selected_countries, capacity_range):
+        bits = self.select_bits(year_range, selected_tours, selected_countries, capacity_range)
+        return np.unpackbits(bits, count=self.n_shows).astype(bool)
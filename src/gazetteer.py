@@ -0,0 +1,117 @@
+# gazetteer.py
+import os
+
+import numpy as np
+import pandas as pd
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+
+# The tour data mixes local country names with English ones; the gazetteer uses English
+COUNTRY_NAMES = {
+    'Danmark': 'Denmark',
+    'الإمارات العربية المتحدة': 'United Arab Emirates',
+    'Nederland': 'Netherlands',
+    'España': 'Spain',
+    'Soomaaliya الصومال': 'Somalia',
+    'Србија': 'Serbia',
+    'Norge': 'Norway',
+    'Deutschland': 'Germany',
+    'Schweiz/Suisse/Svizzera/Svizra': 'Switzerland',
+    'Česko': 'Czechia',
+    'België / Belgique / Belgien': 'Belgium',
+    'România': 'Romania',
+    'Magyarország': 'Hungary',
+    'Crna Gora / Црна Гора': 'Montenegro',
+    'Éire / Ireland': 'Ireland',
+    'New Zealand / Aotearoa': 'New Zealand',
+    'Sverige': 'Sweden',
+    'Suomi / Finland': 'Finland',
+    '中国': 'China',
+    'Österreich': 'Austria',
+    'Türkiye': 'Turkey',
+    'Россия': 'Russia',
+    '日本': 'Japan',
+    'Polska': 'Poland',
+    'Italia': 'Italy',
+    'Brasil': 'Brazil',
+    'México': 'Mexico',
+    'Perú': 'Peru',
+    'Eesti': 'Estonia',
+    'ישראל': 'Israel',
+    'Hrvatska': 'Croatia',
+    # Trailing parts of city_alt ("Ames, IA, USA", "Cardiff, Wales")
+    'USA': 'United States',
+    'England': 'United Kingdom',
+    'Scotland': 'United Kingdom',
+    'Wales': 'United Kingdom',
+    'Northern Ireland': 'United Kingdom',
+    'Hong Kong SAR China': 'Hong Kong',
+    'Macao SAR China': 'Macau',
+}
+
+
+def normalize_country(country):
+    if not isinstance(country, str):
+        return None
+    country = country.strip()
+    return COUNTRY_NAMES.get(country, country)
+
+
+class Gazetteer:
+    """Offline place -> (lat, lon) lookup shipped with the app as gazetteer.csv.
+
+    Rows with an empty ``place`` are country centroids, used when a show's city
+    can't be matched.
+    """
+
+    def __init__(self, path=GAZETTEER_PATH):
+        places = pd.read_csv(path, keep_default_na=False)
+        self.cities = {}
+        self.by_name = {}
+        self.countries = {}
+        for place, country, lat, lon in places.itertuples(index=False):
+            if place:
+                self.cities[(place.casefold(), country)] = (lat, lon)
+                # The first row for an ambiguous name is the fallback when countries disagree
+                self.by_name.setdefault(place.casefold(), (lat, lon))
+            else:
+                self.countries[country] = (lat, lon)
+
+    def locate(self, city, city_alt=None, country=None):
+        """Coordinates of a show, or None.
+
+        ``city`` is tried first against the country from ``city_alt`` and then
+        the ``country`` column (either can be wrong in the source data), then the
+        places named in ``city_alt``, then ``city`` on its own, and finally the
+        country centroid.
+        """
+        alt_parts = [part.strip() for part in city_alt.split(',')] if isinstance(city_alt, str) else []
+        alt_country = normalize_country(alt_parts[-1]) if len(alt_parts) > 1 else None
+        country = normalize_country(country)
+        name = city.strip().casefold() if isinstance(city, str) else None
+
+        for candidate in (alt_country, country):
+            if name and candidate and (name, candidate) in self.cities:
+                return self.cities[(name, candidate)]
+        for part in alt_parts[:-1]:
+            if (part.casefold(), alt_country) in self.cities:
+                return self.cities[(part.casefold(), alt_country)]
+        if name in self.by_name:
+            return self.by_name[name]
+        for candidate in (alt_country, country):
+            if candidate in self.countries:
+                return self.countries[candidate]
+        return None
+
+    def geocode(self, df):
+        """Latitude and longitude arrays for every show in ``df`` (NaN where unknown)."""
+        coords = np.full((len(df), 2), np.nan)
+        located = {}
+        columns = zip(df['city'], df['city_alt'], df['country'])
+        for row, key in enumerate(columns):
+            key = tuple(value if isinstance(value, str) else None for value in key)
+            if key not in located:
+                located[key] = self.locate(*key)
+            if located[key] is not None:
+                coords[row] = located[key]
+        return coords[:, 0], coords[:, 1]
@@ -1,340 +1,418 @@
-from dash import html, dcc, Input, Output
+import json
+import os
+
+from dash import html, dcc, Input, Output, State, Patch, ClientsideFunction
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+import background
+import metrics
+import search
+from cache import ResultCache
+from lazy import LazyModule, per_snapshot
+
+# Imported on first use, so the app can start serving before numpy/pandas and the data are loaded
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+px = LazyModule('plotly.express')
+clientside = LazyModule('clientside')
+data = LazyModule('data')
+downsample = LazyModule('downsample')
+rollup = LazyModule('rollup')
+
+# Filter and aggregate in the browser from a one-off columnar payload instead of per-change requests
+CLIENTSIDE_FILTERING = os.environ.get('HOME_CLIENTSIDE', '').lower() in ('1', 'true', 'yes')
+
+# Cache of rendered Home outputs, kept as the JSON Dash would send anyway;
+# set HOME_CACHE_DIR to share it between workers
+home_cache = ResultCache(
+    max_entries=int(os.environ.get('HOME_CACHE_SIZE', 128)),
+    max_bytes=int(os.environ.get('HOME_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    shared_dir=os.environ.get('HOME_CACHE_DIR') or None,
+    dumps=lambda outputs: to_json_plotly(outputs).encode(),
+    loads=json.loads,
+)
+
+
+# Canonical form of the Home filters, so equivalent selections share a cache entry
+def filter_key(year_range, selected_tours, selected_countries, capacity_range, scatter_relayout=None):
+    x_range = downsample.parse_x_range(scatter_relayout)
+    return (
+        data.tour_data.version,
+        tuple(year_range),
+        tuple(sorted(selected_tours or ())),
+        tuple(sorted(selected_countries or ())),
+        tuple(capacity_range),
+        tuple(x_range) if x_range else None,
+    )
+
+# Key stat tiles: (id, title); callbacks only patch the value under the title
+KEY_STATS = [
+    ('total-concerts', "Total Concerts"),
+    ('countries-visited', "Countries Visited"),
+    ('unique-songs', "Unique Songs"),
+    ('total-attendance', "Est. Total Attendance"),
+    ('gross-revenue', "Est. Gross Revenue"),
+]
+KEY_STAT_WIDTHS = [2, 2, 2, 3, 3]
+
+
+def stat_patch(value):
+    patch = Patch()
+    patch[1]['props']['children'] = value
+    return patch
+
+
+def bar_patch(labels, counts):
+    patch = Patch()
+    patch['data'][0]['y'] = labels
+    patch['data'][0]['x'] = counts
+    patch['data'][0]['marker']['color'] = counts
+    return patch
+
+
+# Static figure skeletons; the callbacks fill in the trace data
+def bar_figure(label):
+    fig = px.bar(
+        pd.DataFrame({label: [], 'Count': []}),
+        y=label,
+        x='Count',
+        labels={'Count': 'Number of Performances'},
+        color='Count',
+        color_continuous_scale=['#f4b308', '#fa1428'],  # Yellow to Red
+        orientation='h'
+    )
+
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
+        xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
+        yaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
+        height=500,
+        margin=dict(l=20, r=20, t=20, b=20),
+        yaxis={'categoryorder':'total ascending'},
+        showlegend=False
+    )
+    return fig
+
+
+def capacity_figure():
+    fig = px.scatter(
+        pd.DataFrame({column: [] for column in ['date', 'venue_capacity', 'venue', 'city', 'country', 'tour_name']}),
+        x='date',
+        y='venue_capacity',
+        labels={'date': 'Date', 'venue_capacity': 'Venue Capacity'},
+        color='venue_capacity',
+        color_continuous_scale=['#f4b308', '#fa1428'],  # Yellow to Red
+        custom_data=['venue', 'city', 'country', 'tour_name'],
+    )
+
+    fig.update_traces(
+        marker=dict(size=8),
+        hovertemplate="<br>".join([
+            "<b>%{customdata[0]}</b>",
+            "Date: %{x|%B %d, %Y}",
+            "Capacity: %{y:,}",
+            "City: %{customdata[1]}",
+            "Country: %{customdata[2]}",
+            "Tour: %{customdata[3]}",
+            "<extra></extra>"
+        ])
+    )
+
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
+        xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
+        yaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
+        height=500,
+        margin=dict(l=20, r=20, t=20, b=20),
+        showlegend=False,
+        uirevision='venue-capacity'
+    )
+
+    fig.update_xaxes(
+        type='date',
+        tickformat='%Y',
+        dtick='M12',
+        showgrid=True,
+        gridcolor='rgba(255,255,255,0.1)'
+    )
+
+    fig.update_yaxes(
+        showgrid=True,
+        gridcolor='rgba(255,255,255,0.1)'
+    )
+    return fig
 
-# Load the data
-df = pd.read_csv('2024_rollingstones_tourdata.csv')
-df['date'] = pd.to_datetime(df['date'])
-df['year'] = df['date'].dt.year
 
-min_year = df['year'].min()
-max_year = df['year'].max()
+# Home layout, built once per data snapshot
+@per_snapshot
+def home_layout(tour_data):
+    df = tour_data.df
+    min_year = df['year'].min()
+    max_year = df['year'].max()
 
-# Home layout
-home_layout = html.Div([
-    html.Div([
+    return html.Div([
+        *([dcc.Store(id='home-data', data=clientside.home_payload(tour_data))] if CLIENTSIDE_FILTERING else []),
         html.Div([
-            html.H1("THE ROLLING STONES", 
-                    style={
-                        'fontFamily': 'Barlow Condensed, sans-serif',
-                        'fontWeight': 'bold',
-                        'color': 'white',
-                        'textAlign': 'center',
-                        'fontSize': '5rem',
-                        'marginBottom': '0',
-                        'paddingTop': '20px',
-                    }),
+            html.Div([
+                html.H1("THE ROLLING STONES", 
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'bold',
+                            'color': 'white',
+                            'textAlign': 'center',
+                            'fontSize': '5rem',
+                            'marginBottom': '0',
+                            'paddingTop': '20px',
+                        }),
             
-            html.H2("(I Can't Get No) Satisfaction? Find It Here!",
-                    style={
-                        'fontFamily': 'Barlow Condensed, sans-serif',
-                        'fontWeight': 'normal',
-                        'color': '#FF4136',
-                        'textAlign': 'center',
-                        'marginTop': '5px',
-                        'marginBottom': '40px',
-                        'fontSize': '2.2rem'
-                    }),
+                html.H2("(I Can't Get No) Satisfaction? Find It Here!",
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'normal',
+                            'color': '#FF4136',
+                            'textAlign': 'center',
+                            'marginTop': '5px',
+                            'marginBottom': '40px',
+                            'fontSize': '2.2rem'
+                        }),
             
-            dbc.Row([
-                dbc.Col([
-                    html.Label("Select Timeframe", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
-                    dcc.RangeSlider(
-                        id='year-range',
-                        min=min_year,
-                        max=max_year,
-                        step=1,
-                        marks={i: str(i) for i in range(min_year, max_year+1, 5)},
-                        value=[min_year, max_year],
-                    ),
-                ], width=3),
-                dbc.Col([
-                    html.Label("Select Tour", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
-                    dcc.Dropdown(
-                        id='tour-dropdown',
-                        options=[{'label': tour, 'value': tour} for tour in df['tour_name'].dropna().unique()],
-                        multi=True,
-                        style={'backgroundColor': '#303030', 'color': 'black'}
-                    ),
-                ], width=3),
-                dbc.Col([
-                    html.Label("Select Country", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
-                    dcc.Dropdown(
-                        id='country-dropdown',
-                        options=[{'label': country, 'value': country} for country in df['country'].dropna().unique()],
-                        multi=True,
-                        style={'backgroundColor': '#303030', 'color': 'black'}
-                    ),
-                ], width=3),
-                dbc.Col([
-                    html.Label("Venue Capacity Range", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
-                    dcc.RangeSlider(
-                        id='capacity-range',
-                        min=10,
-                        max=80000,
-                        step=1000,
-                        marks={i: f'{i:,}' for i in range(0, 80001, 20000)},
-                        value=[10, 80000],
-                    ),
-                ], width=3),
-            ], className="mb-4"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Select Timeframe", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.RangeSlider(
+                            id='year-range',
+                            min=min_year,
+                            max=max_year,
+                            step=1,
+                            marks={i: str(i) for i in range(min_year, max_year+1, 5)},
+                            value=[min_year, max_year],
+                        ),
+                    ], width=3),
+                    dbc.Col([
+                        html.Label("Select Tour", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.Dropdown(
+                            id='tour-dropdown',
+                            options=search.dropdown_options(search.search_index(tour_data, 'tour_name'), None),
+                            multi=True,
+                            style={'backgroundColor': '#303030', 'color': 'black'}
+                        ),
+                    ], width=3),
+                    dbc.Col([
+                        html.Label("Select Country", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.Dropdown(
+                            id='country-dropdown',
+                            options=search.dropdown_options(search.search_index(tour_data, 'country'), None),
+                            multi=True,
+                            style={'backgroundColor': '#303030', 'color': 'black'}
+                        ),
+                    ], width=3),
+                    dbc.Col([
+                        html.Label("Venue Capacity Range", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.RangeSlider(
+                            id='capacity-range',
+                            min=10,
+                            max=80000,
+                            step=1000,
+                            marks={i: f'{i:,}' for i in range(0, 80001, 20000)},
+                            value=[10, 80000],
+                        ),
+                    ], width=3),
+                ], className="mb-4"),
             
-            # Key Stats Row
-            dbc.Row([
-                dbc.Col(html.Div(id='total-concerts', className='key-stat'), width=2),
-                dbc.Col(html.Div(id='countries-visited', className='key-stat'), width=2),
-                dbc.Col(html.Div(id='unique-songs', className='key-stat'), width=2),
-                dbc.Col(html.Div(id='total-attendance', className='key-stat'), width=3),
-                dbc.Col(html.Div(id='gross-revenue', className='key-stat'), width=3),
-            ], className="mb-4", justify="center"),
+                # Key Stats Row
+                dbc.Row([
+                    dbc.Col(html.Div([html.H4(title), html.P()], id=tile_id, className='key-stat'), width=width)
+                    for (tile_id, title), width in zip(KEY_STATS, KEY_STAT_WIDTHS)
+                ], className="mb-4", justify="center"),
             
-            # Charts row
-            dbc.Row([
-                # Most Played Songs chart
-                dbc.Col([
-                    html.H3("Most Played Songs", 
-                            style={
-                                'fontFamily': 'Barlow Condensed, sans-serif',
-                                'fontWeight': 'bold',
-                                'color': 'white',
-                                'textAlign': 'left',
-                                'fontSize': '2rem',
-                                'marginTop': '30px',
-                                'marginBottom': '20px',
-                                'paddingLeft': '20px',
-                            }),
-                    dcc.Graph(id='most-played-songs-chart')
-                ], width=6),
+                # Charts row
+                dbc.Row([
+                    # Most Played Songs chart
+                    dbc.Col([
+                        html.H3("Most Played Songs", 
+                                style={
+                                    'fontFamily': 'Barlow Condensed, sans-serif',
+                                    'fontWeight': 'bold',
+                                    'color': 'white',
+                                    'textAlign': 'left',
+                                    'fontSize': '2rem',
+                                    'marginTop': '30px',
+                                    'marginBottom': '20px',
+                                    'paddingLeft': '20px',
+                                }),
+                        dcc.Graph(id='most-played-songs-chart', figure=bar_figure('Song'))
+                    ], width=6),
                 
-                # Most Visited Cities chart
-                dbc.Col([
-                    html.H3("Most Visited Cities", 
-                            style={
-                                'fontFamily': 'Barlow Condensed, sans-serif',
-                                'fontWeight': 'bold',
-                                'color': 'white',
-                                'textAlign': 'left',
-                                'fontSize': '2rem',
-                                'marginTop': '30px',
-                                'marginBottom': '20px',
-                                'paddingLeft': '20px',
-                            }),
-                    dcc.Graph(id='most-visited-cities-chart')
-                ], width=6)
-            ], justify="center"),
+                    # Most Visited Cities chart
+                    dbc.Col([
+                        html.H3("Most Visited Cities", 
+                                style={
+                                    'fontFamily': 'Barlow Condensed, sans-serif',
+                                    'fontWeight': 'bold',
+                                    'color': 'white',
+                                    'textAlign': 'left',
+                                    'fontSize': '2rem',
+                                    'marginTop': '30px',
+                                    'marginBottom': '20px',
+                                    'paddingLeft': '20px',
+                                }),
+                        dcc.Graph(id='most-visited-cities-chart', figure=bar_figure('City'))
+                    ], width=6)
+                ], justify="center"),
             
-            # New row for the venue capacity scatter plot
-            dbc.Row([
-                dbc.Col([
-                    html.H3("Venue Capacity Over Time", 
-                            style={
-                                'fontFamily': 'Barlow Condensed, sans-serif',
-                                'fontWeight': 'bold',
-                                'color': 'white',
-                                'textAlign': 'left',
-                                'fontSize': '2rem',
-                                'marginTop': '30px',
-                                'marginBottom': '20px',
-                                'paddingLeft': '20px',
-                            }),
-                    dcc.Graph(id='venue-capacity-scatter')
-                ], width=12)
-            ], justify="center")
+                # New row for the venue capacity scatter plot
+                dbc.Row([
+                    dbc.Col([
+                        html.H3("Venue Capacity Over Time", 
+                                style={
+                                    'fontFamily': 'Barlow Condensed, sans-serif',
+                                    'fontWeight': 'bold',
+                                    'color': 'white',
+                                    'textAlign': 'left',
+                                    'fontSize': '2rem',
+                                    'marginTop': '30px',
+                                    'marginBottom': '20px',
+                                    'paddingLeft': '20px',
+                                }),
+                        *([dbc.Progress(id='home-progress', value=0, max=3, color='danger', style={'display': 'none'})]
+                          if background.BACKGROUND_CALLBACKS else []),
+                        dcc.Graph(id='venue-capacity-scatter', figure=capacity_figure())
+                    ], width=12)
+                ], justify="center")
             
+            ], style={
+                'backgroundColor': 'black',
+                'borderRadius': '30px',
+                'padding': '40px',
+                'boxShadow': '0 6px 12px 0 rgba(0, 0, 0, 0.2)',
+                'minHeight': '90vh',
+            }),
         ], style={
-            'backgroundColor': 'black',
-            'borderRadius': '30px',
-            'padding': '40px',
-            'boxShadow': '0 6px 12px 0 rgba(0, 0, 0, 0.2)',
-            'minHeight': '90vh',
+            'width': '95%',
+            'maxWidth': '1600px',
+            'margin': '0 auto',
+            'padding': '20px',
         }),
     ], style={
-        'width': '95%',
-        'maxWidth': '1600px',
-        'margin': '0 auto',
-        'padding': '20px',
-    }),
-], style={
-    'backgroundColor': '#1a1a1a',
-    'minHeight': '100vh',
-    'fontFamily': 'Barlow Condensed, sans-serif',
-})
+        'backgroundColor': '#1a1a1a',
+        'minHeight': '100vh',
+        'fontFamily': 'Barlow Condensed, sans-serif',
+    })
+
 
 def register_home_callbacks(app):
-    @app.callback(
-        [Output('most-played-songs-chart', 'figure'),
-         Output('most-visited-cities-chart', 'figure'),
-         Output('venue-capacity-scatter', 'figure'),
-         Output('total-concerts', 'children'),
-         Output('countries-visited', 'children'),
-         Output('unique-songs', 'children'),
-         Output('total-attendance', 'children'),
-         Output('gross-revenue', 'children')],
-        [Input('year-range', 'value'),
-         Input('tour-dropdown', 'value'),
-         Input('country-dropdown', 'value'),
-         Input('capacity-range', 'value')]
+    # Each output group gets its own callback, and each sends only a Patch of
+    # the values that change; layout, fonts and colorscales stay in the skeletons.
+    filter_inputs = [Input('year-range', 'value'),
+                     Input('tour-dropdown', 'value'),
+                     Input('country-dropdown', 'value'),
+                     Input('capacity-range', 'value')]
+
+    search.register_typeahead(app, 'tour-dropdown', 'tour_name')
+    search.register_typeahead(app, 'country-dropdown', 'country')
+
+    if CLIENTSIDE_FILTERING:
+        register_home_clientside_callbacks(app, filter_inputs)
+        return
+
+    # In background mode, leaving the page cancels the jobs still running
+    cancel = [Input('url', 'pathname')]
+
+    @background.callback(
+        app,
+        [Output(tile_id, 'children') for tile_id, _ in KEY_STATS],
+        filter_inputs,
+        cancel=cancel
     )
-    def update_charts(year_range, selected_tours, selected_countries, capacity_range):
-        # Filter the dataframe based on selections
-        filtered_df = df[
-            (df['year'] >= year_range[0]) & 
-            (df['year'] <= year_range[1]) &
-            (df['venue_capacity'] >= capacity_range[0]) & 
-            (df['venue_capacity'] <= capacity_range[1])
-        ]
-        
-        if selected_tours:
-            filtered_df = filtered_df[filtered_df['tour_name'].isin(selected_tours)]
-        
-        if selected_countries:
-            filtered_df = filtered_df[filtered_df['country'].isin(selected_countries)]
-        
-        # Most Played Songs chart
-        song_counts = []
-        for setlist in filtered_df['setlist'].dropna():
-            songs = eval(setlist)
-            song_counts.extend(songs)
-        
-        song_df = pd.DataFrame({'song': song_counts})
-        song_counts = song_df['song'].value_counts().reset_index()
-        song_counts.columns = ['Song', 'Count']
-        
-        songs_fig = px.bar(
-            song_counts.head(10),
-            y='Song',
-            x='Count',
-            labels={'Count': 'Number of Performances'},
-            color='Count',
-            color_continuous_scale=['#f4b308', '#fa1428'],  # Yellow to Red
-            orientation='h'
-        )
-        
-        songs_fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
-            xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            yaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            height=500,
-            margin=dict(l=20, r=20, t=20, b=20),
-            yaxis={'categoryorder':'total ascending'},
-            showlegend=False
-        )
-        
-        # Most Visited Cities chart
-        city_counts = filtered_df['city'].value_counts().reset_index()
-        city_counts.columns = ['City', 'Count']
-        
-        cities_fig = px.bar(
-            city_counts.head(10),
-            y='City',
-            x='Count',
-            labels={'Count': 'Number of Performances'},
-            color='Count',
-            color_continuous_scale=['#f4b308', '#fa1428'],  # Yellow to Red
-            orientation='h'
-        )
-        
-        cities_fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
-            xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            yaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            height=500,
-            margin=dict(l=20, r=20, t=20, b=20),
-            yaxis={'categoryorder':'total ascending'},
-            showlegend=False
-        )
-        
-        # Venue Capacity Scatter Plot
-        capacity_fig = px.scatter(
-            filtered_df,
-            x='date',
-            y='venue_capacity',
-            labels={'date': 'Date', 'venue_capacity': 'Venue Capacity'},
-            color='venue_capacity',
-            color_continuous_scale=['#f4b308', '#fa1428'],  # Yellow to Red
-            hover_data={
-                'date': '|%B %d, %Y',
-                'venue': True,
-                'city': True,
-                'country': True,
-                'tour_name': True,
-                'venue_capacity': ':,',
-            },
-            custom_data=['venue', 'city', 'country', 'tour_name']
-        )
+    @home_cache.memoize(filter_key)
+    def update_key_stats(year_range, selected_tours, selected_countries, capacity_range):
+        cube = rollup.rollup_cube(data.tour_data)
+        selection = cube.select(year_range, selected_tours, selected_countries, capacity_range)
+        metrics.record_filtered_rows(cube.n_concerts(selection))
+        total_concerts, countries_visited, unique_songs, total_attendance, gross_revenue = cube.key_stats(selection)
 
-        capacity_fig.update_traces(
-            marker=dict(size=8),
-            hovertemplate="<br>".join([
-                "<b>%{customdata[0]}</b>",
-                "Date: %{x|%B %d, %Y}",
-                "Capacity: %{y:,}",
-                "City: %{customdata[1]}",
-                "Country: %{customdata[2]}",
-                "Tour: %{customdata[3]}",
-                "<extra></extra>"
-            ])
+        return (
+            stat_patch(f"{total_concerts:,}"),
+            stat_patch(f"{countries_visited:,}"),
+            stat_patch(f"{unique_songs:,}"),
+            stat_patch(f"{total_attendance:,.0f}"),
+            stat_patch(f"${gross_revenue:,.0f}"),
         )
 
-        capacity_fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
-            xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            yaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
-            height=500,
-            margin=dict(l=20, r=20, t=20, b=20),
-            showlegend=False
-        )
+    @background.callback(app, Output('most-played-songs-chart', 'figure'), filter_inputs, cancel=cancel)
+    @home_cache.memoize(filter_key)
+    def update_songs_chart(year_range, selected_tours, selected_countries, capacity_range):
+        tour_data = data.tour_data
+        mask = tour_data.show_filter.select(year_range, selected_tours, selected_countries, capacity_range)
+        metrics.record_filtered_rows(np.count_nonzero(mask))
+        top, top_counts = tour_data.top_songs(tour_data.song_counts(mask), k=10, mask=mask)
+        return bar_patch([tour_data.songs[song_id] for song_id in top], top_counts)
 
-        capacity_fig.update_xaxes(
-            tickformat='%Y',
-            dtick='M12',
-            showgrid=True,
-            gridcolor='rgba(255,255,255,0.1)'
+    @background.callback(app, Output('most-visited-cities-chart', 'figure'), filter_inputs, cancel=cancel)
+    @home_cache.memoize(filter_key)
+    def update_cities_chart(year_range, selected_tours, selected_countries, capacity_range):
+        cube = rollup.rollup_cube(data.tour_data)
+        selection = cube.select(year_range, selected_tours, selected_countries, capacity_range)
+        metrics.record_filtered_rows(cube.n_concerts(selection))
+        cities, city_counts = cube.top_cities(selection, k=10)
+        return bar_patch(cities, city_counts)
+
+    @background.callback(
+        app,
+        Output('venue-capacity-scatter', 'figure'),
+        filter_inputs + [Input('venue-capacity-scatter', 'relayoutData')],
+        progress=[Output('home-progress', 'value')],
+        running=[(Output('home-progress', 'style'), {'display': 'flex'}, {'display': 'none'})],
+        cancel=cancel
+    )
+    @home_cache.memoize(lambda set_progress, *args: filter_key(*args))
+    def update_capacity_scatter(set_progress, year_range, selected_tours, selected_countries, capacity_range,
+                                scatter_relayout=None):
+        tour_data = data.tour_data
+        mask = tour_data.show_filter.select(year_range, selected_tours, selected_countries, capacity_range)
+        metrics.record_filtered_rows(np.count_nonzero(mask))
+        filtered_df = tour_data.df[mask]
+        set_progress(1)
+
+        # Downsampled to the visible x-range
+        x_range = downsample.x_range_to_ns(downsample.parse_x_range(scatter_relayout))
+        scatter_rows = downsample.sample_rows(
+            filtered_df['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            filtered_df['venue_capacity'].to_numpy(),
+            x_range=x_range,
         )
+        scatter_df = filtered_df.iloc[scatter_rows]
+        set_progress(2)
+
+        patch = Patch()
+        patch['data'][0]['type'] = 'scattergl' if len(scatter_df) > downsample.WEBGL_THRESHOLD else 'scatter'
+        patch['data'][0]['x'] = scatter_df['date'].to_numpy()
+        patch['data'][0]['y'] = scatter_df['venue_capacity'].to_numpy()
+        patch['data'][0]['marker']['color'] = scatter_df['venue_capacity'].to_numpy()
+        patch['data'][0]['customdata'] = scatter_df[['venue', 'city', 'country', 'tour_name']].to_numpy()
+        return patch
+
 
-        capacity_fig.update_yaxes(
-            showgrid=True,
-            gridcolor='rgba(255,255,255,0.1)'
+# Same outputs as the server callbacks, computed by assets/home_clientside.js
+def register_home_clientside_callbacks(app, filter_inputs):
+    store = State('home-data', 'data')
+    app.clientside_callback(
+        ClientsideFunction(namespace='home', function_name='keyStats'),
+        [Output(tile_id, 'children') for tile_id, _ in KEY_STATS],
+        filter_inputs,
+        [store] + [State(tile_id, 'children') for tile_id, _ in KEY_STATS]
+    )
+    for graph_id, function_name in [('most-played-songs-chart', 'songsChart'),
+                                    ('most-visited-cities-chart', 'citiesChart'),
+                                    ('venue-capacity-scatter', 'capacityScatter')]:
+        app.clientside_callback(
+            ClientsideFunction(namespace='home', function_name=function_name),
+            Output(graph_id, 'figure'),
+            filter_inputs,
+            [store, State(graph_id, 'figure')]
         )
-        
-        # Calculate key stats
-        total_concerts = len(filtered_df)
-        countries_visited = filtered_df['country'].nunique()
-        unique_songs = len(set(song_counts['Song']))
-        total_attendance = filtered_df['venue_capacity'].sum()
-        gross_revenue = (filtered_df['venue_capacity'] * filtered_df['avg_price']).sum()
-        
-        # Format key stats
-        total_concerts_html = html.Div([
-            html.H4("Total Concerts"),
-            html.P(f"{total_concerts:,}")
-        ])
-        
-        countries_visited_html = html.Div([
-            html.H4("Countries Visited"),
-            html.P(f"{countries_visited:,}")
-        ])
-        
-        unique_songs_html = html.Div([
-            html.H4("Unique Songs"),
-            html.P(f"{unique_songs:,}")
-        ])
-        
-        total_attendance_html = html.Div([
-            html.H4("Est. Total Attendance"),
-            html.P(f"{total_attendance:,.0f}")
-        ])
-        
-        gross_revenue_html = html.Div([
-            html.H4("Est. Gross Revenue"),
-            html.P(f"${gross_revenue:,.0f}")
-        ])
-        
-        return songs_fig, cities_fig, capacity_fig, total_concerts_html, countries_visited_html, unique_songs_html, total_attendance_html, gross_revenue_html
\ No newline at end of file
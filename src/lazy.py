@@ -0,0 +1,42 @@
+# lazy.py
+import functools
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Lets the page modules and app.py be imported (and the first response served)
+    without paying for numpy/pandas/scipy and the tour data until a page needs them.
+    The import itself goes through importlib, so concurrent first accesses are safe.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f'<lazy module {self._name!r}{"" if self._module is None else " (loaded)"}>'
+
+
+def per_snapshot(builder):
+    """Cache ``builder(tour_data)`` for the latest data snapshot.
+
+    Like ``functools.lru_cache(maxsize=1)``, but concurrent first calls (the
+    warm-up thread and the first visitor) wait for one build instead of each
+    doing it.
+    """
+    lock = threading.Lock()
+    cached = functools.lru_cache(maxsize=1)(builder)
+
+    @functools.wraps(builder)
+    def wrapper(tour_data):
+        with lock:
+            return cached(tour_data)
+    return wrapper
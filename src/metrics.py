@@ -0,0 +1,205 @@
+# metrics.py
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+
+import flask
+
+logger = logging.getLogger(__name__)
+
+# Callbacks slower than this are logged (and their profile dumped when sampled)
+SLOW_CALLBACK_MS = float(os.environ.get('METRICS_SLOW_MS', 500))
+# Share of callback requests run under cProfile
+PROFILE_SAMPLE_RATE = float(os.environ.get('METRICS_PROFILE_RATE', 0))
+# Optional directory for the .prof files of slow sampled callbacks
+PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR') or None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+CARDINALITY_BUCKETS = (0, 1, 2, 5, 10, 20, 50)
+ROWS_BUCKETS = (0, 10, 100, 1e3, 1e4, 1e5, 1e6)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense, one series per label set."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                lines.append(f'{self.name}_bucket{format_labels(labels + (("le", str(bound)),))} {count}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {counts[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{format_labels(labels)} {value}' for labels, value in sorted(self.series.items())]
+        return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+class CallbackMetrics:
+    """Per-callback latency, payload, input cardinality and filtered-row metrics.
+
+    Metrics are kept per worker process and exposed in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duration = Histogram('dash_callback_duration_seconds', 'Callback request latency.', LATENCY_BUCKETS)
+        self.response_bytes = Histogram('dash_callback_response_bytes', 'Callback response body size.', BYTES_BUCKETS)
+        self.cardinality = Histogram('dash_callback_input_cardinality',
+                                     'Number of values selected in list-valued inputs.', CARDINALITY_BUCKETS)
+        self.filtered_rows = Histogram('dash_callback_filtered_rows', 'Rows left after filtering.', ROWS_BUCKETS)
+        self.errors = Counter('dash_callback_errors_total', 'Callback requests answered with an error status.')
+        self.slow = Counter('dash_callback_slow_total', f'Callbacks slower than {SLOW_CALLBACK_MS:g}ms.')
+        self.coalesced = Counter('dash_callback_coalesced_total',
+                                 'Callback requests dropped because the page sent a newer one.')
+
+    def record(self, callback, seconds, nbytes, status, inputs, rows, coalesced=False):
+        labels = (('callback', callback),)
+        with self._lock:
+            self.duration.observe(labels, seconds)
+            self.response_bytes.observe(labels, nbytes)
+            for item in inputs:
+                if isinstance(item, dict) and isinstance(item.get('value'), list) and 'property' in item:
+                    input_id = f"{item.get('id')}.{item['property']}"
+                    self.cardinality.observe(labels + (('input', input_id),), len(item['value']))
+            for count in rows:
+                self.filtered_rows.observe(labels, count)
+            if status >= 400:
+                self.errors.inc(labels)
+            if seconds * 1000 >= SLOW_CALLBACK_MS:
+                self.slow.inc(labels)
+            if coalesced:
+                self.coalesced.inc(labels)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in [self.duration, self.response_bytes, self.cardinality,
+                           self.filtered_rows, self.errors, self.slow, self.coalesced]:
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+callback_metrics = CallbackMetrics()
+
+
+# Called from callbacks to report how many rows their filters kept
+def record_filtered_rows(count):
+    if flask.has_request_context():
+        flask.g.setdefault('metrics_rows', []).append(int(count))
+
+
+# Called when a superseded callback request is answered with "no update" (see coalesce.py)
+def record_coalesced():
+    if flask.has_request_context():
+        flask.g.metrics_coalesced = True
+
+
+def _flatten_inputs(inputs):
+    for item in inputs or []:
+        # Pattern-matching inputs arrive as nested lists
+        if isinstance(item, list):
+            yield from _flatten_inputs(item)
+        else:
+            yield item
+
+
+def init_app(server, callback_map, path='/metrics'):
+    """Instrument Dash callback requests on ``server`` and serve the metrics at ``path``.
+
+    ``callback_map`` is the app's ``callback_map`` (read per request, so it may
+    still be filling up). Series are labelled with its outputs and inputs only;
+    requests for any other output are counted under ``unknown``, so clients
+    cannot add series by making up names.
+    """
+
+    @server.before_request
+    def start_callback_timer():
+        if not flask.request.path.endswith('/_dash-update-component'):
+            return
+        flask.g.metrics_start = time.perf_counter()
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            flask.g.metrics_profiler = cProfile.Profile()
+            flask.g.metrics_profiler.enable()
+
+    @server.after_request
+    def record_callback(response):
+        start = flask.g.pop('metrics_start', None)
+        if start is None:
+            return response
+        profiler = flask.g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+
+        body = flask.request.get_json(silent=True)
+        body = body if isinstance(body, dict) else {}
+        output = body.get('output')
+        spec = callback_map.get(output) if isinstance(output, str) else None
+        callback = output if spec is not None else 'unknown'
+        declared = {f"{item['id']}.{item['property']}" for item in spec['inputs']} if spec else set()
+        nbytes = response.calculate_content_length() or 0
+        inputs = [item for item in _flatten_inputs(body.get('inputs'))
+                  if isinstance(item, dict) and f"{item.get('id')}.{item.get('property')}" in declared]
+        callback_metrics.record(callback, seconds, nbytes, response.status_code, inputs,
+                                flask.g.pop('metrics_rows', []), flask.g.pop('metrics_coalesced', False))
+
+        if seconds * 1000 >= SLOW_CALLBACK_MS:
+            logger.warning('slow callback %s: %.0fms, %d bytes, inputs %s',
+                           callback, seconds * 1000, nbytes, [item.get('value') for item in inputs])
+            if profiler is not None:
+                _dump_profile(profiler, callback)
+        return response
+
+    @server.route(path)
+    def metrics():
+        return flask.Response(callback_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _dump_profile(profiler, callback):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(25)
+    logger.warning('profile of slow callback %s:\n%s', callback, stream.getvalue())
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in callback).strip('_')[:80]
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f'{name}-{int(time.time() * 1000)}.prof'))
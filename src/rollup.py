@@ -0,0 +1,158 @@
+# rollup.py
+import functools
+
+import numpy as np
+from scipy import sparse
+
+# Capacity buckets line up with the Home capacity slider (min 10, step 1000)
+CAPACITY_ORIGIN = 10
+CAPACITY_STEP = 1000
+
+
+class RollupCube:
+    """Pre-aggregated year x tour x country x capacity bucket cube for the Home KPIs.
+
+    Only non-empty cells are stored. Each cell holds additive measures (concerts,
+    attendance, revenue) and mergeable per-value summaries: city counts with the
+    first row of each city (for the ranking's tie order), and a cells x songs
+    count matrix. Country is a dimension, so distinct countries are the distinct
+    country codes of the selected cells.
+
+    A filter selects whole cells when every show of a capacity bucket falls in
+    the capacity range. Shows of the buckets at the ends of the range that are
+    only partly covered are taken from the raw rows and merged in. Shows without
+    a capacity never match the capacity filter, so they are not in the cube.
+    """
+
+    def __init__(self, tour_data):
+        df = tour_data.df
+        self.tour_data = tour_data
+        self.tour_categories = df['tour_name'].cat.categories
+        self.country_categories = df['country'].cat.categories
+        self.n_countries = len(self.country_categories)
+        self.n_cities = len(df['city'].cat.categories)
+
+        capacity = df['venue_capacity'].to_numpy(dtype=float)
+        rows = np.flatnonzero(~np.isnan(capacity))
+        self.row_year = df['year'].to_numpy()
+        self.row_tour = df['tour_name'].cat.codes.to_numpy()
+        self.row_country = df['country'].cat.codes.to_numpy()
+        self.row_city = df['city'].cat.codes.to_numpy()
+        self.row_capacity = capacity
+        revenue = capacity * df['avg_price'].to_numpy(dtype=float)
+        self.row_revenue = np.where(np.isnan(revenue), 0.0, revenue)
+
+        buckets = np.floor((capacity[rows] - CAPACITY_ORIGIN) / CAPACITY_STEP).astype(np.int64)
+        keys = np.stack([self.row_year[rows], self.row_tour[rows], self.row_country[rows], buckets], axis=1)
+        cells, cell_of_row = np.unique(keys, axis=0, return_inverse=True)
+        cell_of_row = cell_of_row.ravel()
+        n_cells = len(cells)
+        self.cell_year, self.cell_tour, self.cell_country, cell_bucket = cells.T
+
+        self.cell_concerts = np.bincount(cell_of_row, minlength=n_cells)
+        self.cell_attendance = np.bincount(cell_of_row, weights=capacity[rows], minlength=n_cells)
+        self.cell_revenue = np.bincount(cell_of_row, weights=self.row_revenue[rows], minlength=n_cells)
+
+        # Capacity span of each bucket, to tell whether a range covers all of it
+        self.buckets, cell_bucket = np.unique(cell_bucket, return_inverse=True)
+        self.cell_bucket = cell_bucket.ravel()
+        bucket_of_row = self.cell_bucket[cell_of_row]
+        self.bucket_min = np.full(len(self.buckets), np.inf)
+        self.bucket_max = np.full(len(self.buckets), -np.inf)
+        np.minimum.at(self.bucket_min, bucket_of_row, capacity[rows])
+        np.maximum.at(self.bucket_max, bucket_of_row, capacity[rows])
+
+        # City entries: one per (cell, city) with its count and first row
+        city = self.row_city[rows]
+        valid = city >= 0
+        entries, entry_of_row = np.unique(cell_of_row[valid] * (self.n_cities + 1) + city[valid],
+                                          return_inverse=True)
+        entry_of_row = entry_of_row.ravel()
+        self.entry_cell = entries // (self.n_cities + 1)
+        self.entry_city = entries % (self.n_cities + 1)
+        self.entry_count = np.bincount(entry_of_row, minlength=len(entries))
+        self.entry_first = np.full(len(entries), len(df), dtype=np.int64)
+        np.minimum.at(self.entry_first, entry_of_row, rows[valid])
+
+        cell_shows = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (cell_of_row, rows)), shape=(n_cells, len(df)))
+        self.cell_song_matrix = (cell_shows @ tour_data.show_song_matrix).tocsr()
+
+    def _codes(self, categories, values):
+        codes = categories.get_indexer(values)
+        return codes[codes >= 0]
+
+    def select(self, year_range, selected_tours, selected_countries, capacity_range):
+        """The Home filters as (selected cells, raw rows of partly covered buckets)."""
+        start, end = year_range
+        low, high = capacity_range
+        show_filter = self.tour_data.show_filter
+
+        covered = (self.bucket_min >= low) & (self.bucket_max <= high)
+        cells = covered[self.cell_bucket] & (self.cell_year >= start) & (self.cell_year <= end)
+        if selected_tours:
+            cells &= np.isin(self.cell_tour, self._codes(self.tour_categories, selected_tours))
+        if selected_countries:
+            cells &= np.isin(self.cell_country, self._codes(self.country_categories, selected_countries))
+
+        # Rows in the capacity range outside the covered buckets sit at its two ends
+        sorted_capacity = show_filter.sorted_capacity
+        first = np.searchsorted(sorted_capacity, low, side='left')
+        stop = np.searchsorted(sorted_capacity, high, side='right')
+        if covered.any():
+            inner = np.flatnonzero(covered)
+            inner_start = np.searchsorted(sorted_capacity, self.bucket_min[inner[0]], side='left')
+            inner_stop = np.searchsorted(sorted_capacity, self.bucket_max[inner[-1]], side='right')
+            edge = np.concatenate([show_filter.capacity_rows[first:max(first, inner_start)],
+                                   show_filter.capacity_rows[min(stop, inner_stop):stop]])
+        else:
+            edge = show_filter.capacity_rows[first:stop]
+        keep = (self.row_year[edge] >= start) & (self.row_year[edge] <= end)
+        if selected_tours:
+            keep &= np.isin(self.row_tour[edge], self._codes(self.tour_categories, selected_tours))
+        if selected_countries:
+            keep &= np.isin(self.row_country[edge], self._codes(self.country_categories, selected_countries))
+        return cells, np.sort(edge[keep])
+
+    def n_concerts(self, selection):
+        cells, rows = selection
+        return int(self.cell_concerts[cells].sum()) + len(rows)
+
+    # (concerts, countries visited, unique songs, attendance, gross revenue) of a selection
+    def key_stats(self, selection):
+        cells, rows = selection
+        countries = np.zeros(self.n_countries + 1, dtype=bool)
+        countries[self.cell_country[cells]] = True
+        countries[self.row_country[rows]] = True
+        song_counts = self.cell_song_matrix.T @ cells.astype(np.int32)
+        if len(rows):
+            song_counts = song_counts + np.asarray(self.tour_data.show_song_matrix[rows].sum(axis=0)).ravel()
+        return (
+            self.n_concerts(selection),
+            np.count_nonzero(countries[:self.n_countries]),
+            np.count_nonzero(song_counts),
+            self.cell_attendance[cells].sum() + self.row_capacity[rows].sum(),
+            self.cell_revenue[cells].sum() + self.row_revenue[rows].sum(),
+        )
+
+    # The k most visited cities of a selection, ties in order of first appearance
+    def top_cities(self, selection, k=10):
+        cells, rows = selection
+        entries = cells[self.entry_cell]
+        city = np.concatenate([self.entry_city[entries], self.row_city[rows]])
+        count = np.concatenate([self.entry_count[entries], np.ones(len(rows), dtype=np.int64)])
+        first = np.concatenate([self.entry_first[entries], rows])
+        valid = city >= 0
+        city, count, first = city[valid], count[valid], first[valid]
+
+        counts = np.bincount(city, weights=count, minlength=self.n_cities).astype(np.int64)
+        firsts = np.full(self.n_cities, self.tour_data.n_shows, dtype=np.int64)
+        np.minimum.at(firsts, city, first)
+        present = np.flatnonzero(counts)
+        top = present[np.lexsort((firsts[present], -counts[present]))][:k]
+        return self.tour_data.df['city'].cat.categories.to_numpy()[top], counts[top]
+
+
+@functools.lru_cache(maxsize=2)
+def rollup_cube(tour_data):
+    return RollupCube(tour_data)
@@ -0,0 +1,134 @@
+# routes.py
+import functools
+import weakref
+
+import numpy as np
+
+from gazetteer import Gazetteer
+
+# Douglas-Peucker tolerance (degrees) per zoom level, coarsest first
+ZOOM_TOLERANCES = [3.0, 1.0, 0.25, 0.0]
+# geo.projection.scale at which each finer zoom level starts
+ZOOM_SCALES = [1.5, 3, 6]
+
+
+def zoom_level(relayout_data):
+    scale = (relayout_data or {}).get('geo.projection.scale')
+    if scale is None:
+        return None
+    return int(np.searchsorted(ZOOM_SCALES, scale, side='right'))
+
+
+# Douglas-Peucker significance of every point: the largest tolerance at which it survives
+def simplification_significance(x, y):
+    n = len(x)
+    significance = np.zeros(n)
+    if n == 0:
+        return significance
+    significance[[0, -1]] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        norm = np.hypot(dx, dy)
+        distance = np.abs(dx * py - dy * px) / norm if norm else np.hypot(px, py)
+        split = start + 1 + int(np.argmax(distance))
+        # Capped by the parent so a point never outlives the segment it splits
+        significance[split] = min(distance[split - start - 1], parent)
+        stack.append((start, split, significance[split]))
+        stack.append((split, end, significance[split]))
+    return significance
+
+
+class TourRoute:
+    """Date-ordered, geocoded shows of one tour plus its simplified variants."""
+
+    def __init__(self, name, rows, lat, lon, dates, years, labels):
+        self.name = name
+        self.rows = rows
+        self.lat = lat
+        self.lon = lon
+        self.years = years
+        self.text = [f'<b>{name}</b><br>{label}<br>{date:%B %d, %Y}' for label, date in zip(labels, dates)]
+        significance = simplification_significance(lon, lat)
+        self.levels = [np.flatnonzero(significance >= tolerance) for tolerance in ZOOM_TOLERANCES[:-1]]
+        self.levels.append(np.arange(len(rows)))
+
+    def points(self, year_range, level):
+        """Point positions inside ``year_range`` that are kept at ``level``."""
+        start = np.searchsorted(self.years, year_range[0], side='left')
+        stop = np.searchsorted(self.years, year_range[1], side='right')
+        if stop <= start:
+            return np.array([], dtype=np.int64)
+        kept = self.levels[level]
+        kept = kept[(kept >= start) & (kept < stop)]
+        # The visible stretch always starts and ends at its real first and last show
+        return np.union1d(kept, [start, stop - 1])
+
+
+class TourRoutes:
+    """Per-tour route polylines for the Tour Exploration map, built once per data snapshot.
+
+    With ``previous``, the routes of the snapshot ``tour_data`` was appended to,
+    only the appended shows are geocoded and only the tours they belong to are
+    rebuilt; the other tours keep their routes.
+    """
+
+    def __init__(self, tour_data, gazetteer=None, previous=None):
+        gazetteer = gazetteer or Gazetteer()
+        df = tour_data.df
+        first_show = 0 if previous is None else len(previous.lat)
+        lat, lon = gazetteer.geocode(df.iloc[first_show:])
+        if previous is not None:
+            lat, lon = np.concatenate([previous.lat, lat]), np.concatenate([previous.lon, lon])
+        self.lat, self.lon = lat, lon
+        labels = (df['venue'].astype(object).fillna('') + ', ' + df['city'].astype(object).fillna('')).str.strip(', ').to_numpy()
+
+        self.routes = {}
+        located = df[~np.isnan(lat) & df['tour_name'].notna()]
+        rebuilt = located
+        if previous is not None:
+            rebuilt = located[located['tour_name'].isin(located['tour_name'][located.index >= first_show])]
+        for name, shows in rebuilt.groupby('tour_name', sort=False, observed=True):
+            shows = shows.sort_values('date', kind='stable')
+            rows = shows.index.to_numpy()
+            self.routes[name] = TourRoute(name, rows, lat[rows], lon[rows], shows['date'],
+                                          shows['year'].to_numpy(), labels[rows])
+        if previous is not None:
+            # In order of each tour's first located show, as a full build groups them
+            self.routes = {name: self.routes[name] if name in self.routes else previous.routes[name]
+                           for name in located['tour_name'].unique()}
+        # Chronological order of tours, used for the dropdown and trace order
+        self.tour_names = sorted(self.routes, key=lambda name: df.at[self.routes[name].rows[0], 'date'])
+
+    def route_data(self, tour_names, year_range, level):
+        """Simplified polylines of the given tours (all tours when empty) within ``year_range``."""
+        traces = []
+        for name in tour_names or self.tour_names:
+            route = self.routes.get(name)
+            if route is None:
+                continue
+            points = route.points(year_range, level)
+            if len(points):
+                traces.append({
+                    'name': name,
+                    'lat': route.lat[points],
+                    'lon': route.lon[points],
+                    'text': [route.text[point] for point in points],
+                })
+        return traces
+
+
+# Routes by snapshot, so one appended to a snapshot that has them extends them
+_built = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=2)
+def tour_routes(tour_data):
+    previous = tour_data.appended_to()
+    routes = TourRoutes(tour_data, previous=_built.get(previous) if previous is not None else None)
+    _built[tour_data] = routes
+    return routes
@@ -0,0 +1,117 @@
+# search.py
+import bisect
+import functools
+import re
+
+from dash import Input, Output, State
+
+import coalesce
+from lazy import LazyModule
+
+# Imported on first use (see home.py)
+np = LazyModule('numpy')
+data = LazyModule('data')
+
+# Options a dropdown shows before and while typing
+SEARCH_LIMIT = 20
+
+
+def normalize(text):
+    text = re.sub(r"['\u2019]", '', text.casefold())
+    return ' '.join(re.sub(r'\W+', ' ', text).split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Typeahead index over a dropdown's labels, ranked by a weight (play or show count).
+
+    Queries shorter than three characters match the start of a word through a
+    sorted word list; longer ones intersect trigram posting lists and confirm the
+    substring. Matches at the start of the label come first, then those at the
+    start of a word, then the rest, each by descending weight.
+    """
+
+    def __init__(self, labels, weights):
+        self.labels = list(labels)
+        self.weights = np.asarray(weights)
+        self.normalized = [normalize(label) for label in self.labels]
+
+        self.words = sorted((word, i) for i, text in enumerate(self.normalized) for word in set(text.split()))
+        postings = {}
+        for i, text in enumerate(self.normalized):
+            for gram in trigrams(text):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.by_weight = sorted(range(len(self.labels)), key=lambda i: (-self.weights[i], self.labels[i]))
+
+    def _word_prefix(self, query):
+        start = bisect.bisect_left(self.words, (query,))
+        stop = bisect.bisect_left(self.words, (query + '\uffff',))
+        return {i for _, i in self.words[start:stop]}
+
+    def _substring(self, query):
+        grams = sorted(trigrams(query), key=lambda gram: len(self.postings.get(gram, ())))
+        if not grams or grams[0] not in self.postings:
+            return set()
+        ids = self.postings[grams[0]]
+        for gram in grams[1:]:
+            ids = np.intersect1d(ids, self.postings[gram], assume_unique=True)
+        return {i for i in ids.tolist() if query in self.normalized[i]}
+
+    def top(self, limit=SEARCH_LIMIT):
+        return [self.labels[i] for i in self.by_weight[:limit]]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = normalize(query)
+        if not query:
+            return self.top(limit)
+        matches = self._word_prefix(query) if len(query) < 3 else self._substring(query)
+
+        def rank(i):
+            text = self.normalized[i]
+            where = 0 if text.startswith(query) else 1 if f' {query}' in f' {text}' else 2
+            return where, -self.weights[i], self.labels[i]
+        return [self.labels[i] for i in sorted(matches, key=rank)[:limit]]
+
+
+# Index of a dropdown's values, built once per data snapshot (by the layout that shows them)
+@functools.lru_cache(maxsize=8)
+def search_index(tour_data, field):
+    if field == 'song':
+        return SearchIndex(tour_data.songs, np.diff(tour_data.song_offsets))
+    values = tour_data.df[field]
+    codes = values.cat.codes.to_numpy().astype(np.int64)
+    counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+    present = np.flatnonzero(counts)
+    return SearchIndex(values.cat.categories.to_numpy()[present], counts[present])
+
+
+# The dropdown filters options again in the browser, so give it the normalized text too
+def options(labels):
+    return [{'label': label, 'value': label, 'search': f'{label} {normalize(label)}'} for label in labels]
+
+
+# Options of a dropdown: the selected values followed by the best matches
+def dropdown_options(index, selected, query=''):
+    selected = [] if selected is None else selected if isinstance(selected, list) else [selected]
+    return options(selected + [label for label in index.search(query) if label not in selected])
+
+
+def register_typeahead(app, dropdown_id, field):
+    """Serve ``dropdown_id``'s options from the search index as the user types.
+
+    The layout only ships the top options; the selected values are always kept
+    in the list, as the dropdown drops values missing from its options. A cleared
+    search (after a selection or on blur) goes back to the top options.
+    """
+    def update_options(search_value, selected):
+        return dropdown_options(search_index(data.tour_data, field), selected, search_value or '')
+
+    app.callback(
+        Output(dropdown_id, 'options'),
+        [Input(dropdown_id, 'search_value')],
+        [State(dropdown_id, 'value'), coalesce.PAGE_STATE]
+    )(coalesce.latest_only(update_options, name=f'search.{dropdown_id}'))
@@ -0,0 +1,85 @@
+# shared.py
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keep the snapshot arrays in memory-mapped .npy files, so every worker on the
+# host reads the same page-cache pages instead of holding its own copy
+SHARED_ARRAYS = os.environ.get('DATA_SHARED_ARRAYS', '1').lower() not in ('0', 'false', 'no')
+# Where the array stores live; defaults to a directory next to the CSV
+SHARED_DIR = os.environ.get('DATA_SHARED_DIR')
+# Versions kept on disk: the current one and the one workers may still be reading
+KEEP_VERSIONS = 2
+# Bumped whenever the arrays a store holds or their meaning change; it is part of the
+# store's directory name, so stores written by older code are never adopted
+STORE_FORMAT = 1
+
+MANIFEST = 'manifest.json'
+
+
+def store_dir_for(path):
+    return SHARED_DIR or os.path.splitext(path)[0] + '.arrays'
+
+
+def _write_store(directory, arrays, manifest):
+    manifest = {**manifest, 'arrays': sorted(arrays)}
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(values), allow_pickle=False)
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+
+def _read_store(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+              for name in manifest['arrays']}
+    return arrays, manifest
+
+
+# Drop all but the newest KEEP_VERSIONS stores; workers still mapping a removed
+# version keep reading it until they let go of the snapshot
+def _prune(root):
+    stores = [os.path.join(root, name) for name in os.listdir(root) if not name.startswith('.')]
+    stores.sort(key=os.path.getmtime, reverse=True)
+    for directory in stores[KEEP_VERSIONS:]:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def share(tour_data, path):
+    """Back ``tour_data``'s arrays with read-only memory maps of its version's store.
+
+    The first process to share a version writes the store (into a temporary
+    directory renamed into place, so readers never see a partial one); the rest
+    map the existing files. With gunicorn's ``preload_app`` the master shares
+    the initial snapshot before forking, and workers that load a reloaded CSV
+    converge on the same files. Falls back to the in-memory arrays if the store
+    cannot be written or read.
+    """
+    if not SHARED_ARRAYS or tour_data.version is None:
+        return tour_data
+    root = store_dir_for(path)
+    name = f'v{STORE_FORMAT}-{tour_data.version}'
+    directory = os.path.join(root, name)
+    try:
+        if not os.path.exists(directory):
+            staging = os.path.join(root, f'.{name}.{os.getpid()}')
+            os.makedirs(staging, exist_ok=True)
+            try:
+                _write_store(staging, *tour_data.to_arrays())
+                os.rename(staging, directory)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+                # Another worker renamed its copy into place first
+                if not os.path.exists(directory):
+                    raise
+            _prune(root)
+        tour_data.adopt_arrays(*_read_store(directory))
+    except (OSError, ValueError, KeyError):
+        logger.exception('sharing tour data arrays in %s failed, keeping them in memory', directory)
+    return tour_data
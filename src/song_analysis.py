@@ -1,91 +1,153 @@
 # song_analysis.py
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
-import pandas as pd
 import plotly.graph_objs as go
-import numpy as np
 
-# Load the data
-df = pd.read_csv('2024_rollingstones_tourdata.csv')
+import background
+import search
+from lazy import LazyModule, per_snapshot
 
-# Function to get all unique songs from setlists
-def get_all_songs(df):
-    all_songs = set()
-    for setlist in df['setlist'].dropna():
-        songs = eval(setlist)
-        all_songs.update(songs)
-    return sorted(list(all_songs))
+# Imported on first use (see home.py)
+pd = LazyModule('pandas')
+data = LazyModule('data')
+transitions = LazyModule('transitions')
 
-all_songs = get_all_songs(df)
+# Songs listed in each of the opener/closer/transition charts
+TOP_SONGS = 10
 
-# Normalize position to a 20-song setlist
-def normalize_position(position, setlist_length):
-    return round((position / setlist_length) * 20)
 
-# Song Analysis layout
-song_analysis_layout = html.Div([
-    html.Div([
+def song_bar_figure(labels, values, title, x_title, suffix=''):
+    fig = go.Figure(go.Bar(
+        x=values,
+        y=labels,
+        orientation='h',
+        marker=dict(color=values, colorscale=[[0, '#f4b308'], [1, '#fa1428']]),  # Yellow to Red
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
+        title_font=dict(family="Barlow Condensed, sans-serif", size=24, color="white"),
+        xaxis_title_font=dict(family="Barlow Condensed, sans-serif", size=16, color="white"),
+        height=450,
+        margin=dict(l=20, r=20, t=80, b=50),
+        yaxis={'categoryorder': 'total ascending'},
+    )
+    fig.update_xaxes(showgrid=True, gridcolor='rgba(255,255,255,0.1)', ticksuffix=suffix)
+    return fig
+
+
+# The k highest counts as (song names, counts), ties going to the earlier song id
+def top_counts(tour_data, counts, k=TOP_SONGS):
+    top, top_counts = tour_data.top_songs(counts, k)
+    return [tour_data.songs[song_id] for song_id in top], top_counts
+
+
+# Song Analysis layout, built once per data snapshot
+@per_snapshot
+def song_analysis_layout(tour_data):
+    # The dropdown ships the most played songs; the rest are found by typing (search.py)
+    all_songs = tour_data.all_songs
+    selected_song = all_songs[0] if all_songs else None
+    min_year = int(tour_data.df['year'].min())
+    max_year = int(tour_data.df['year'].max())
+
+    return html.Div([
         html.Div([
-            html.H1("THE ROLLING STONES", 
-                    style={
-                        'fontFamily': 'Barlow Condensed, sans-serif',
-                        'fontWeight': 'bold',
-                        'color': 'white',
-                        'textAlign': 'center',
-                        'fontSize': '5rem',
-                        'marginBottom': '0',
-                        'paddingTop': '20px',
-                    }),
+            html.Div([
+                html.H1("THE ROLLING STONES", 
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'bold',
+                            'color': 'white',
+                            'textAlign': 'center',
+                            'fontSize': '5rem',
+                            'marginBottom': '0',
+                            'paddingTop': '20px',
+                        }),
             
-            html.H2("Song Analysis",
-                    style={
-                        'fontFamily': 'Barlow Condensed, sans-serif',
-                        'fontWeight': 'normal',
-                        'color': '#FF4136',
-                        'textAlign': 'center',
-                        'marginTop': '5px',
-                        'marginBottom': '40px',
-                        'fontSize': '2.2rem'
-                    }),
+                html.H2("Song Analysis",
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'normal',
+                            'color': '#FF4136',
+                            'textAlign': 'center',
+                            'marginTop': '5px',
+                            'marginBottom': '40px',
+                            'fontSize': '2.2rem'
+                        }),
             
-            dbc.Row([
-                dbc.Col([
-                    html.Label("Select a Song", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
-                    dcc.Dropdown(
-                        id='song-dropdown',
-                        options=[{'label': song, 'value': song} for song in all_songs],
-                        value=all_songs[0] if all_songs else None,
-                        style={'backgroundColor': '#303030', 'color': 'black'}
-                    ),
-                ], width=6, className="mb-4"),
-            ], justify="center"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Select a Song", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.Dropdown(
+                            id='song-dropdown',
+                            options=search.dropdown_options(search.search_index(tour_data, 'song'), selected_song),
+                            value=selected_song,
+                            style={'backgroundColor': '#303030', 'color': 'black'}
+                        ),
+                    ], width=6, className="mb-4"),
+                ], justify="center"),
             
-            dbc.Row([
-                dbc.Col([
-                    dcc.Graph(id='song-position-chart')
-                ], width=12)
-            ], justify="center")
+                dbc.Row([
+                    dbc.Col([
+                        dcc.Graph(id='song-position-chart')
+                    ], width=12)
+                ], justify="center"),
+
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Transitions Timeframe", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.RangeSlider(
+                            id='song-year-range',
+                            min=min_year,
+                            max=max_year,
+                            step=1,
+                            marks={i: str(i) for i in range(min_year, max_year+1, 5)},
+                            value=[min_year, max_year],
+                        ),
+                    ], width=8, className="mb-4 mt-4"),
+                ], justify="center"),
+
+                *([dbc.Progress(id='song-progress', value=0, max=2, color='danger', style={'display': 'none'})]
+                  if background.BACKGROUND_CALLBACKS else []),
+
+                dbc.Row([
+                    dbc.Col([dcc.Graph(id='song-next-chart')], width=6),
+                    dbc.Col([dcc.Graph(id='song-cooccurrence-chart')], width=6),
+                ]),
+
+                dbc.Row([
+                    dbc.Col([dcc.Graph(id='song-openers-chart')], width=6),
+                    dbc.Col([dcc.Graph(id='song-closers-chart')], width=6),
+                ]),
             
+            ], style={
+                'backgroundColor': 'black',
+                'borderRadius': '30px',
+                'padding': '40px',
+                'boxShadow': '0 6px 12px 0 rgba(0, 0, 0, 0.2)',
+                'minHeight': '90vh',
+            }),
         ], style={
-            'backgroundColor': 'black',
-            'borderRadius': '30px',
-            'padding': '40px',
-            'boxShadow': '0 6px 12px 0 rgba(0, 0, 0, 0.2)',
-            'minHeight': '90vh',
+            'width': '95%',
+            'maxWidth': '1600px',
+            'margin': '0 auto',
+            'padding': '20px',
         }),
     ], style={
-        'width': '95%',
-        'maxWidth': '1600px',
-        'margin': '0 auto',
-        'padding': '20px',
-    }),
-], style={
-    'backgroundColor': '#1a1a1a',
-    'minHeight': '100vh',
-    'fontFamily': 'Barlow Condensed, sans-serif',
-})
+        'backgroundColor': '#1a1a1a',
+        'minHeight': '100vh',
+        'fontFamily': 'Barlow Condensed, sans-serif',
+    })
+
 
 def register_song_analysis_callbacks(app):
+    search.register_typeahead(app, 'song-dropdown', 'song')
+
     @app.callback(
         [Output('song-position-chart', 'figure'),
          Output('song-dropdown', 'value')],
@@ -96,20 +158,13 @@ def register_song_analysis_callbacks(app):
         if not selected_song:
             return go.Figure(), current_value  # Return an empty chart and maintain current value if no song is selected
 
-        normalized_positions = []
-        for setlist in df['setlist'].dropna():
-            songs = eval(setlist)
-            if selected_song in songs:
-                position = songs.index(selected_song) + 1
-                setlist_length = len(songs)
-                normalized_position = normalize_position(position, setlist_length)
-                normalized_positions.append(normalized_position)
+        tour_data = data.tour_data
+        song_id = tour_data.song_index.get(selected_song)
+        if song_id is None:
+            return go.Figure(), current_value
 
-        position_counts = pd.Series(normalized_positions).value_counts().sort_index()
-
-        # Create a full range of positions from 1 to 20
-        full_range = pd.Series(range(1, 21))
-        position_counts = position_counts.reindex(full_range, fill_value=0)
+        # Precomputed distribution over positions 1 to 20
+        position_counts = pd.Series(tour_data.position_histograms[song_id], index=range(1, data.POSITION_BINS + 1))
 
         # Convert to percentages
         total = position_counts.sum()
@@ -154,4 +209,48 @@ def register_song_analysis_callbacks(app):
             ticksuffix='%'
         )
 
-        return fig, selected_song  # Return the figure and maintain the selected song in the dropdown
\ No newline at end of file
+        return fig, selected_song  # Return the figure and maintain the selected song in the dropdown
+
+    @background.callback(
+        app,
+        [Output('song-openers-chart', 'figure'),
+         Output('song-closers-chart', 'figure')],
+        [Input('song-year-range', 'value')],
+        cancel=[Input('url', 'pathname')]
+    )
+    def update_opener_closer_charts(year_range):
+        tour_data = data.tour_data
+        engine = transitions.song_transitions(tour_data)
+        openers = song_bar_figure(*top_counts(tour_data, engine.openers(year_range)), "Show Openers", "Number of Shows")
+        closers = song_bar_figure(*top_counts(tour_data, engine.closers(year_range)), "Show Closers", "Number of Shows")
+        return openers, closers
+
+    @background.callback(
+        app,
+        [Output('song-next-chart', 'figure'),
+         Output('song-cooccurrence-chart', 'figure')],
+        [Input('song-dropdown', 'value'),
+         Input('song-year-range', 'value')],
+        progress=[Output('song-progress', 'value')],
+        running=[(Output('song-progress', 'style'), {'display': 'flex'}, {'display': 'none'})],
+        cancel=[Input('url', 'pathname')]
+    )
+    def update_song_neighbour_charts(set_progress, selected_song, year_range):
+        tour_data = data.tour_data
+        song_id = tour_data.song_index.get(selected_song)
+        if song_id is None:
+            return go.Figure(), go.Figure()
+
+        engine = transitions.song_transitions(tour_data)
+        next_songs, next_counts = top_counts(tour_data, engine.next_songs(song_id, year_range))
+        next_fig = song_bar_figure(next_songs, next_counts, f"Songs Played After '{selected_song}'",
+                                   "Number of Performances")
+        set_progress(1)
+
+        # Share of the shows with the selected song that also had the other song
+        cooccurrence, shows = engine.cooccurring_songs(song_id, year_range)
+        together, together_counts = top_counts(tour_data, cooccurrence)
+        shares = (together_counts / shows * 100).round(2) if shows else together_counts
+        cooccurrence_fig = song_bar_figure(together, shares, f"Played Together With '{selected_song}'",
+                                           "Share of Shows", suffix='%')
+        return next_fig, cooccurrence_fig
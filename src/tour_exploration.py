@@ -1,19 +1,178 @@
 # tour_exploration.py
-from dash import html, dcc
+import json
+
+from dash import html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
+import plotly.graph_objs as go
+from plotly.io.json import to_json_plotly
+
+import coalesce
+import search
+from cache import ResultCache
+from lazy import LazyModule, per_snapshot
+
+# Imported on first use (see home.py)
+data = LazyModule('data')
+routes = LazyModule('routes')
+
+# Route colors, cycled over the tours shown (yellow to red like the other pages)
+ROUTE_COLORS = ['#f4b308', '#fa1428', '#ff7f0e', '#ffd166', '#e63946', '#f77f00', '#fcbf49', '#d62828']
+
+route_cache = ResultCache(
+    max_entries=64,
+    dumps=lambda figure: to_json_plotly(figure).encode(),
+    loads=json.loads,
+)
+
+
+def route_key(selected_tours, year_range, level):
+    return (data.tour_data.version, tuple(sorted(selected_tours or ())), tuple(year_range), level)
+
+
+# Tour Exploration layout, built once per data snapshot
+@per_snapshot
+def tour_exploration_layout(tour_data):
+    min_year = int(tour_data.df['year'].min())
+    max_year = int(tour_data.df['year'].max())
+
+    return html.Div([
+        html.Div([
+            html.Div([
+                html.H1("THE ROLLING STONES",
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'bold',
+                            'color': 'white',
+                            'textAlign': 'center',
+                            'fontSize': '5rem',
+                            'marginBottom': '0',
+                            'paddingTop': '20px',
+                        }),
+
+                html.H2("Tour Exploration",
+                        style={
+                            'fontFamily': 'Barlow Condensed, sans-serif',
+                            'fontWeight': 'normal',
+                            'color': '#FF4136',
+                            'textAlign': 'center',
+                            'marginTop': '5px',
+                            'marginBottom': '40px',
+                            'fontSize': '2.2rem'
+                        }),
+
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Select Tour", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.Dropdown(
+                            id='route-tour-dropdown',
+                            options=search.dropdown_options(search.search_index(tour_data, 'tour_name'), None),
+                            multi=True,
+                            placeholder="All tours",
+                            style={'backgroundColor': '#303030', 'color': 'black'}
+                        ),
+                    ], width=6),
+                    dbc.Col([
+                        html.Label("Select Timeframe", style={'color': 'white', 'fontSize': '1.2rem', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                        dcc.RangeSlider(
+                            id='route-year-range',
+                            min=min_year,
+                            max=max_year,
+                            step=1,
+                            marks={i: str(i) for i in range(min_year, max_year+1, 5)},
+                            value=[min_year, max_year],
+                        ),
+                    ], width=6),
+                ], className="mb-4"),
+
+                dbc.Row([
+                    dbc.Col([
+                        dcc.Store(id='route-zoom-level', data=0),
+                        dcc.Graph(id='tour-map')
+                    ], width=12)
+                ], justify="center")
+
+            ], style={
+                'backgroundColor': 'black',
+                'borderRadius': '30px',
+                'padding': '40px',
+                'boxShadow': '0 6px 12px 0 rgba(0, 0, 0, 0.2)',
+                'minHeight': '90vh',
+            }),
+        ], style={
+            'width': '95%',
+            'maxWidth': '1600px',
+            'margin': '0 auto',
+            'padding': '20px',
+        }),
+    ], style={
+        'backgroundColor': '#1a1a1a',
+        'minHeight': '100vh',
+        'fontFamily': 'Barlow Condensed, sans-serif',
+    })
 
-tour_exploration_layout = html.Div([
-    html.H1("Tour Exploration", style={'textAlign': 'center', 'marginTop': '20px'}),
-    html.P("World map with tour routes will be implemented here.", style={'textAlign': 'center'}),
-    # We'll add the map component here later
-], style={
-    'backgroundColor': '#1a1a1a',
-    'minHeight': '100vh',
-    'fontFamily': 'Barlow Condensed, sans-serif',
-    'padding': '20px',
-    'color': 'white'
-})
 
 def register_tour_exploration_callbacks(app):
-    # We'll add callbacks here later
-    pass
\ No newline at end of file
+    search.register_typeahead(app, 'route-tour-dropdown', 'tour_name')
+
+    # Only a change of zoom level (not every pan) re-requests the routes
+    @app.callback(
+        Output('route-zoom-level', 'data'),
+        [Input('tour-map', 'relayoutData')],
+        [State('route-zoom-level', 'data')]
+    )
+    def update_zoom_level(relayout_data, current_level):
+        level = routes.zoom_level(relayout_data)
+        if level is None or level == current_level:
+            return no_update
+        return level
+
+    @app.callback(
+        Output('tour-map', 'figure'),
+        [Input('route-tour-dropdown', 'value'),
+         Input('route-year-range', 'value'),
+         Input('route-zoom-level', 'data')],
+        [coalesce.PAGE_STATE]
+    )
+    @coalesce.latest_only
+    @route_cache.memoize(route_key)
+    def update_tour_map(selected_tours, year_range, level):
+        tour_routes = routes.tour_routes(data.tour_data)
+
+        fig = go.Figure()
+        for i, route in enumerate(tour_routes.route_data(selected_tours, year_range, level or 0)):
+            fig.add_trace(go.Scattergeo(
+                lat=route['lat'],
+                lon=route['lon'],
+                text=route['text'],
+                name=route['name'],
+                mode='lines+markers',
+                line=dict(width=1.5, color=ROUTE_COLORS[i % len(ROUTE_COLORS)]),
+                marker=dict(size=5, color=ROUTE_COLORS[i % len(ROUTE_COLORS)]),
+                hovertemplate="%{text}<extra></extra>",
+            ))
+
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Barlow Condensed, sans-serif", size=14, color="white"),
+            height=700,
+            margin=dict(l=20, r=20, t=20, b=20),
+            showlegend=bool(selected_tours),
+            legend=dict(bgcolor='rgba(0,0,0,0.5)'),
+            uirevision='tour-map',
+        )
+
+        fig.update_geos(
+            projection_type='natural earth',
+            showland=True,
+            landcolor='#303030',
+            showocean=True,
+            oceancolor='#1a1a1a',
+            showcountries=True,
+            countrycolor='rgba(255,255,255,0.2)',
+            coastlinecolor='rgba(255,255,255,0.3)',
+            showframe=False,
+            bgcolor='rgba(0,0,0,0)',
+        )
+
+        return fig
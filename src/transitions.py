@@ -0,0 +1,172 @@
+# transitions.py
+import functools
+import threading
+import weakref
+
+import numpy as np
+from scipy import sparse
+
+
+class SongTransitions:
+    """Setlist bigram (song -> next song) and co-occurrence counts, per year.
+
+    Every year gets its own sparse songs x songs block, stacked into one CSR
+    matrix so year ``i`` is rows ``i * n_songs`` to ``(i + 1) * n_songs``.
+    Co-occurrence counts shows where both songs were played (the diagonal is
+    the number of shows with the song). Openers and closers are dense
+    years x songs counts with prefix sums, so any year range is a subtraction.
+
+    ``matrices(year_range)`` sums the year blocks of a range and keeps the last
+    result, so moving the range only adds and subtracts the years at its edges.
+
+    With ``previous``, the instance of the snapshot ``tour_data`` was appended
+    to, only the appended shows are counted; its blocks and counts are moved to
+    the new year and song layout and added in.
+    """
+
+    def __init__(self, tour_data, previous=None):
+        n_songs = tour_data.n_songs
+        self.n_songs = n_songs
+        self.n_shows = tour_data.n_shows
+        self.years = np.unique(tour_data.df['year'].to_numpy())
+        show_year = np.searchsorted(self.years, tour_data.df['year'].to_numpy())
+        n_years = len(self.years)
+
+        first_show = 0 if previous is None else previous.n_shows
+        performances = tour_data.performances
+        show_ids = performances['show_id'].to_numpy()
+        first = int(np.searchsorted(show_ids, first_show))
+        show_ids = show_ids[first:]
+        song_ids = performances['song_id'].to_numpy()[first:].astype(np.int64)
+        positions = performances['position'].to_numpy()[first:]
+        perf_years = show_year[show_ids]
+
+        # Performances are ordered by show and position, so bigrams are neighbouring rows of one show
+        same_show = show_ids[1:] == show_ids[:-1]
+        self.year_transitions = self._stack(perf_years[:-1][same_show], song_ids[:-1][same_show],
+                                            song_ids[1:][same_show], n_years)
+
+        # Binary shows x songs matrix: a song played twice in a show co-occurs once
+        shows = sparse.csr_matrix(tour_data.show_song_matrix[first_show:], copy=True)
+        shows.data[:] = 1
+        # The same shows with each song moved to its show's year block, so one product stacks every year
+        columns = shows.indices + np.repeat(show_year[first_show:] * n_songs, np.diff(shows.indptr))
+        by_year = sparse.csr_matrix((shows.data, columns, shows.indptr), shape=(shows.shape[0], n_years * n_songs))
+        self.year_cooccurrence = (by_year.T @ shows).tocsr()
+
+        closers = positions == performances['setlist_length'].to_numpy()[first:]
+        opener_counts = self._counts(perf_years[positions == 1], song_ids[positions == 1], n_years)
+        closer_counts = self._counts(perf_years[closers], song_ids[closers], n_years)
+
+        if previous is not None:
+            # Year i of ``previous`` is year moved[i] here
+            moved = np.searchsorted(self.years, previous.years)
+            self.year_transitions = self.year_transitions + self._move(previous.year_transitions, previous, moved)
+            self.year_cooccurrence = self.year_cooccurrence + self._move(previous.year_cooccurrence, previous, moved)
+            opener_counts[moved, :previous.n_songs] += np.diff(previous.opener_prefix, axis=0)
+            closer_counts[moved, :previous.n_songs] += np.diff(previous.closer_prefix, axis=0)
+        self.opener_prefix = self._prefix(opener_counts)
+        self.closer_prefix = self._prefix(closer_counts)
+
+        self._lock = threading.Lock()
+        self._window = None
+
+    def _stack(self, years, sources, targets, n_years):
+        return sparse.csr_matrix(
+            (np.ones(len(sources), dtype=np.int32), (years * self.n_songs + sources, targets)),
+            shape=(n_years * self.n_songs, self.n_songs),
+        )
+
+    # Stacked year blocks of ``previous`` laid out for this instance's years and songs
+    def _move(self, matrix, previous, moved):
+        matrix = matrix.tocoo()
+        years, sources = np.divmod(matrix.row, previous.n_songs)
+        return sparse.csr_matrix(
+            (matrix.data, (moved[years] * self.n_songs + sources, matrix.col)),
+            shape=(len(self.years) * self.n_songs, self.n_songs),
+        )
+
+    def _counts(self, years, song_ids, n_years):
+        counts = np.bincount(years * self.n_songs + song_ids, minlength=n_years * self.n_songs)
+        return counts.reshape(n_years, self.n_songs)
+
+    def _prefix(self, counts):
+        prefix = np.zeros((counts.shape[0] + 1, self.n_songs), dtype=np.int64)
+        np.cumsum(counts, axis=0, out=prefix[1:])
+        return prefix
+
+    # Year indices [start, stop) covered by an inclusive year range
+    def year_slice(self, year_range):
+        start = int(np.searchsorted(self.years, year_range[0], side='left'))
+        stop = int(np.searchsorted(self.years, year_range[1], side='right'))
+        return start, max(start, stop)
+
+    def _block(self, matrix, year):
+        return matrix[year * self.n_songs:(year + 1) * self.n_songs]
+
+    def _sum_years(self, years):
+        transitions = sparse.csr_matrix((self.n_songs, self.n_songs), dtype=np.int64)
+        cooccurrence = sparse.csr_matrix((self.n_songs, self.n_songs), dtype=np.int64)
+        for year in years:
+            transitions = transitions + self._block(self.year_transitions, year)
+            cooccurrence = cooccurrence + self._block(self.year_cooccurrence, year)
+        return transitions, cooccurrence
+
+    def matrices(self, year_range):
+        """Transition and co-occurrence matrices (songs x songs CSR) summed over ``year_range``."""
+        start, stop = self.year_slice(year_range)
+        with self._lock:
+            window = self._window
+        if window is not None and window[0] < stop and start < window[1]:
+            old_start, old_stop, transitions, cooccurrence = window
+            added = [*range(start, old_start), *range(old_stop, stop)]
+            removed = [*range(old_start, start), *range(stop, old_stop)]
+            if added or removed:
+                plus, minus = self._sum_years(added), self._sum_years(removed)
+                transitions = transitions + plus[0] - minus[0]
+                cooccurrence = cooccurrence + plus[1] - minus[1]
+                transitions.eliminate_zeros()
+                cooccurrence.eliminate_zeros()
+        else:
+            transitions, cooccurrence = self._sum_years(range(start, stop))
+        with self._lock:
+            self._window = (start, stop, transitions, cooccurrence)
+        return transitions, cooccurrence
+
+    # Forget the last summed range (the next call recomputes it from the year blocks)
+    def clear(self):
+        with self._lock:
+            self._window = None
+
+    def openers(self, year_range):
+        start, stop = self.year_slice(year_range)
+        return self.opener_prefix[stop] - self.opener_prefix[start]
+
+    def closers(self, year_range):
+        start, stop = self.year_slice(year_range)
+        return self.closer_prefix[stop] - self.closer_prefix[start]
+
+    # Counts of the songs that directly follow ``song_id`` within the year range
+    def next_songs(self, song_id, year_range):
+        transitions, _ = self.matrices(year_range)
+        return transitions[song_id].toarray().ravel()
+
+    # Shows playing each song together with ``song_id``, and the shows playing ``song_id`` at all
+    def cooccurring_songs(self, song_id, year_range):
+        _, cooccurrence = self.matrices(year_range)
+        counts = cooccurrence[song_id].toarray().ravel()
+        shows = counts[song_id]
+        counts[song_id] = 0
+        return counts, shows
+
+
+# Instances by snapshot, so one appended to a snapshot that has them extends them
+_built = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=2)
+def song_transitions(tour_data):
+    previous = tour_data.appended_to()
+    transitions = SongTransitions(tour_data, previous=_built.get(previous) if previous is not None else None)
+    _built[tour_data] = transitions
+    return transitions
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app's modules live flat in src/ and import each other by name
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+# Tests load their own CSVs; no reload threads
+os.environ.setdefault('DATA_RELOAD_SECONDS', '0')
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filters import ShowFilter
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src', '2024_rollingstones_tourdata.csv')
+FILTER_COLUMNS = ['year', 'tour_name', 'country', 'venue_capacity']
+
+
+# The pandas masks the Home page filtered with before ShowFilter
+def pandas_mask(df, year_range, selected_tours, selected_countries, capacity_range):
+    mask = (
+        (df['year'] >= year_range[0]) &
+        (df['year'] <= year_range[1]) &
+        (df['venue_capacity'] >= capacity_range[0]) &
+        (df['venue_capacity'] <= capacity_range[1])
+    )
+    if selected_tours:
+        mask &= df['tour_name'].isin(selected_tours)
+    if selected_countries:
+        mask &= df['country'].isin(selected_countries)
+    return mask.to_numpy()
+
+
+# Strings as categoricals in order of first appearance and year as int16, like data.compact_frame
+def compact(df):
+    df = df.copy()
+    for column in ['tour_name', 'country']:
+        df[column] = pd.Categorical(df[column], categories=df[column].dropna().unique())
+    df['year'] = df['year'].astype(np.int16)
+    return df
+
+
+def synthetic_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    capacity = rng.integers(10, 80000, n).astype(float)
+    capacity[rng.random(n) < 0.3] = np.nan
+    tours = np.array([f'Tour {i}' for i in range(12)] + [None], dtype=object)
+    countries = np.array([f'Country {i}' for i in range(25)] + [None], dtype=object)
+    return pd.DataFrame({
+        'year': rng.integers(1962, 2025, n),
+        'tour_name': tours[rng.integers(0, len(tours), n)],
+        'country': countries[rng.integers(0, len(countries), n)],
+        'venue_capacity': capacity,
+    })
+
+
+def random_filters(df, rng):
+    tours = list(df['tour_name'].dropna().unique()) + ['No Such Tour']
+    countries = list(df['country'].dropna().unique()) + ['Atlantis']
+    years = sorted(rng.integers(1950, 2035, 2))
+    capacities = sorted(rng.choice([-100.0, 0.0, 10.0, 5000.0, 80000.0, 1e6, *rng.uniform(0, 90000, 4)], 2))
+    selected_tours = list(rng.choice(tours, rng.integers(0, 4), replace=False))
+    selected_countries = list(rng.choice(countries, rng.integers(0, 4), replace=False))
+    return [int(years[0]), int(years[1])], selected_tours, selected_countries, capacities
+
+
+@pytest.fixture(scope='module', params=['csv', 'synthetic'])
+def frame(request):
+    if request.param == 'csv':
+        return pd.read_csv(CSV_PATH, usecols=FILTER_COLUMNS)
+    return synthetic_frame(3000)
+
+
+@pytest.mark.parametrize('compacted', [False, True])
+def test_select_matches_pandas_masks(frame, compacted):
+    df = compact(frame) if compacted else frame
+    show_filter = ShowFilter(df)
+    rng = np.random.default_rng(5)
+    for _ in range(500):
+        filters = random_filters(frame, rng)
+        np.testing.assert_array_equal(show_filter.select(*filters), pandas_mask(frame, *filters), err_msg=str(filters))
+
+
+def test_missing_capacity_never_matches(frame):
+    mask = ShowFilter(frame).select([0, 3000], None, None, [-np.inf, np.inf])
+    np.testing.assert_array_equal(mask, frame['venue_capacity'].notna().to_numpy())
+
+
+@pytest.mark.parametrize('filters', [
+    ([1900, 1950], None, None, [10, 80000]),          # years before the first show
+    ([2030, 2040], None, None, [10, 80000]),          # years after the last show
+    ([2000, 1990], None, None, [10, 80000]),          # reversed range
+    ([1962, 2024], ['No Such Tour'], None, [10, 80000]),
+    ([1962, 2024], None, ['Atlantis'], [10, 80000]),
+    ([1962, 2024], None, None, [80001, 1e9]),         # capacities above the largest venue
+    ([1962, 2024], None, None, [-5, 9]),              # capacities below the smallest venue
+    ([1962, 2024], [], [], [10, 80000]),              # empty selections select everything
+])
+def test_edge_cases(frame, filters):
+    np.testing.assert_array_equal(ShowFilter(frame).select(*filters), pandas_mask(frame, *filters))
+
+
+def test_adopted_arrays_select_the_same(frame):
+    show_filter = ShowFilter(compact(frame))
+    arrays, labels = show_filter.to_arrays()
+    adopted = ShowFilter(compact(frame))
+    adopted.adopt_arrays({name: values.copy() for name, values in arrays.items()}, labels)
+    rng = np.random.default_rng(11)
+    for _ in range(100):
+        filters = random_filters(frame, rng)
+        np.testing.assert_array_equal(adopted.select(*filters), show_filter.select(*filters))
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+import routes
+import transitions
+
+SHOWS = 1500
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    with open(data.DATA_PATH, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    path = tmp_path / 'tour.csv'
+    path.write_bytes(b''.join(lines[:SHOWS + 1]))
+    return str(path), lines[SHOWS + 1:]
+
+
+@pytest.fixture
+def manager(csv_path, monkeypatch):
+    path, _ = csv_path
+    monkeypatch.setattr(data, 'tour_data', data.load_tour_data(path))
+    return data.TourDataManager(path)
+
+
+def append(path, text):
+    with open(path, 'ab') as f:
+        f.write(text)
+
+
+def assert_same_snapshot(a, b):
+    assert a.version == b.version
+    pd.testing.assert_frame_equal(a.df, b.df)
+    pd.testing.assert_frame_equal(a.performances, b.performances)
+    assert a.songs == b.songs
+    np.testing.assert_array_equal(a.position_histograms, b.position_histograms)
+    assert (a.show_song_matrix != b.show_song_matrix).nnz == 0
+
+
+def test_appended_rows_extend_the_snapshot(csv_path, manager):
+    path, rest = csv_path
+    append(path, b''.join(rest[:3]))
+    assert manager.refresh()
+    assert data.tour_data.n_shows == SHOWS + 3
+    assert_same_snapshot(data.tour_data, data.load_tour_data(path, use_cache=False))
+
+
+def assert_same_transitions(a, b):
+    np.testing.assert_array_equal(a.years, b.years)
+    for name in ['year_transitions', 'year_cooccurrence']:
+        assert getattr(a, name).shape == getattr(b, name).shape
+        assert (getattr(a, name) != getattr(b, name)).nnz == 0
+    np.testing.assert_array_equal(a.opener_prefix, b.opener_prefix)
+    np.testing.assert_array_equal(a.closer_prefix, b.closer_prefix)
+
+
+def assert_same_routes(a, b):
+    np.testing.assert_array_equal(a.lat, b.lat)
+    assert list(a.routes) == list(b.routes)
+    assert a.tour_names == b.tour_names
+    for name, route in a.routes.items():
+        expected = b.routes[name]
+        np.testing.assert_array_equal(route.rows, expected.rows)
+        assert route.text == expected.text
+        for level, expected_level in zip(route.levels, expected.levels):
+            np.testing.assert_array_equal(level, expected_level)
+
+
+def test_appended_snapshot_extends_transitions_and_routes(csv_path, manager):
+    path, rest = csv_path
+    previous = data.tour_data
+    previous_transitions = transitions.song_transitions(previous)
+    routes.tour_routes(previous)
+
+    # Later shows bring new years, tours and songs
+    for chunk in [rest[:40], rest[40:]]:
+        append(path, b''.join(chunk))
+        assert manager.refresh()
+        assert data.tour_data.appended_to() is previous
+        assert_same_transitions(transitions.song_transitions(data.tour_data), transitions.SongTransitions(data.tour_data))
+        assert_same_routes(routes.tour_routes(data.tour_data), routes.TourRoutes(data.tour_data))
+        previous = data.tour_data
+    assert data.tour_data.n_songs > previous_transitions.n_songs
+    assert len(transitions.song_transitions(data.tour_data).years) > len(previous_transitions.years)
+
+
+def test_partly_written_row_waits(csv_path, manager):
+    path, rest = csv_path
+    row = rest[0]
+    append(path, row[:len(row) // 2])
+    assert not manager.refresh()
+    assert data.tour_data.n_shows == SHOWS
+
+    append(path, row[len(row) // 2:])
+    assert manager.refresh()
+    assert data.tour_data.n_shows == SHOWS + 1
+    assert_same_snapshot(data.tour_data, data.load_tour_data(path, use_cache=False))
+
+
+def test_malformed_appended_row_falls_back_to_a_full_reload(csv_path, manager, monkeypatch):
+    path, _ = csv_path
+    reloads = []
+
+    def load_tour_data(*args, **kwargs):
+        reloads.append(args)
+        return real_load(*args, **kwargs)
+    real_load = data.load_tour_data
+    monkeypatch.setattr(data, 'load_tour_data', load_tour_data)
+
+    # A whole line whose setlist cell is not a complete list
+    append(path, b'9999,The Rolling Stones,2024-07-10,Venue,City,2024,"[\'Brown Sugar\', \'Angie\'",,,,,,,,,\n')
+    current = data.tour_data
+    with pytest.raises(SyntaxError):
+        manager.refresh()
+    assert len(reloads) == 1
+    assert data.tour_data is current
+
+    # Not retried until the CSV changes again, then loaded once it is fixed
+    assert not manager.refresh()
+    assert len(reloads) == 1
+    with open(data.DATA_PATH, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(path, 'wb') as f:
+        f.write(b''.join(lines[:SHOWS + 2]))
+    assert manager.refresh()
+    assert data.tour_data.n_shows == SHOWS + 1